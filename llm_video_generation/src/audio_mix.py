@@ -0,0 +1,255 @@
+"""
+audio_mix.py
+────────────────────────────────────────────────────────────
+音声トラックをプロセス内 (NumPy) で 1 本にまとめるミキサー
+
+- TTS の WAV は bytes でもファイルパスでもよい (パスは読み取り専用で mmap し、丸ごとコピーしない)
+  1 行ずつデコードしてはタイムラインに足すので、台本が長くてもメモリは増えない
+- 尺やフォーマットは RIFF ヘッダから読む (ffprobe は使わない。mmap なら先頭ページだけ読む)
+- 台詞を計算済みのオフセットに置き、BGM はループ + 減衰、SE は所定の時刻に足す
+- 結果は 48 kHz stereo 16bit PCM の WAV 1 本。映像側はそれを mux するだけ
+  (セグメントごとの aresample / concat / amix / adelay を ffmpeg で何度も回さない)
+- mp3 など WAV 以外 (BGM / SE) は ffmpeg で 1 回だけ f32le にデコードしてメモリに保持
+  48 kHz 以外の WAV も ffmpeg (swresample の帯域制限付きリサンプラ) に任せる
+  (TTS は 48 kHz で合成させるので、台詞は NumPy だけでデコードできる)
+"""
+from __future__ import annotations
+
+import contextlib
+import functools
+import mmap
+import os
+import struct
+import subprocess
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Union
+
+import numpy as np
+
+from llm_video_generation.src import encoding
+
+SAMPLE_RATE = encoding.SAMPLE_RATE
+CHANNELS    = encoding.CHANNELS
+MONO_TO_STEREO_GAIN = 0.5 ** 0.5
+
+# WAV の受け渡し形式: メモリ上の bytes か、ファイルのパス
+WavSource = Union[bytes, bytearray, memoryview, str, Path]
+
+
+@contextlib.contextmanager
+def wav_buffer(src: WavSource) -> Iterator[Union[bytes, bytearray, memoryview, mmap.mmap]]:
+    """bytes 系はそのまま、パスは読み取り専用の mmap にして渡す (ファイル全体は読まない)
+
+    mmap は with を抜けるときに閉じる (Windows では開いている間 WAV を消せないため)。
+    """
+    if isinstance(src, (bytes, bytearray, memoryview, mmap.mmap)):
+        yield src
+        return
+    with open(src, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        yield m
+
+
+# ────────────────────────────
+# RIFF / WAVE ヘッダ
+# ────────────────────────────
+WAVE_FORMAT_PCM        = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+@dataclass(frozen=True)
+class WavInfo:
+    """WAV のフォーマットと data チャンクの位置"""
+    format_tag: int          # WAVE_FORMAT_PCM / WAVE_FORMAT_IEEE_FLOAT (EXTENSIBLE は中身に展開済み)
+    channels: int
+    sample_rate: int
+    bits: int
+    data_offset: int
+    data_size: int
+
+    @property
+    def block_align(self) -> int:
+        return self.channels * self.bits // 8
+
+    @property
+    def frames(self) -> int:
+        return self.data_size // self.block_align
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate
+
+
+def wav_info(src: WavSource) -> WavInfo:
+    """WAV の fmt / data チャンクを読む (サンプルはデコードしない)"""
+    with wav_buffer(src) as data:
+        return _parse_wav_info(data)
+
+
+def _parse_wav_info(data) -> WavInfo:
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("RIFF/WAVE ではありません")
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        size = int.from_bytes(data[pos + 4:pos + 8], "little")
+        body = pos + 8
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", data, body)
+            if fmt[0] == WAVE_FORMAT_EXTENSIBLE and size >= 40:
+                # SubFormat GUID の先頭 2 byte が実際のフォーマット
+                fmt = (struct.unpack_from("<H", data, body + 24)[0], *fmt[1:])
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("fmt チャンクより前に data チャンクがあります")
+            tag, channels, rate, _, _, bits = fmt
+            # ストリーミング書き出しで data サイズが未確定 (0 / 0xFFFFFFFF) のものは末尾まで
+            if size in (0, 0xFFFFFFFF) or body + size > len(data):
+                size = len(data) - body
+            return WavInfo(tag, channels, rate, bits, body, size)
+        pos = body + size + (size & 1)         # チャンクは偶数境界に揃う
+    raise ValueError("data チャンクがありません")
+
+
+# ────────────────────────────
+# デコード
+# ────────────────────────────
+def _to_stereo(x: np.ndarray) -> np.ndarray:
+    if x.shape[1] == CHANNELS:
+        return x
+    if x.shape[1] == 1:
+        # ffmpeg (swresample) と同じく mono は -3 dB で L/R に振る
+        return np.repeat(x * MONO_TO_STEREO_GAIN, CHANNELS, axis=1)
+    return x[:, :CHANNELS]
+
+
+def decode_wav(src: WavSource) -> np.ndarray:
+    """PCM / float WAV (VOICEVOX の出力など) → (n, 2) float32 @ SAMPLE_RATE
+
+    SAMPLE_RATE 以外の WAV は ffmpeg でリサンプルする (線形補間では折り返しが残る)。
+    """
+    with wav_buffer(src) as data:
+        info = wav_info(data)
+        if info.sample_rate != SAMPLE_RATE:
+            return _ffmpeg_decode(data)
+        # サンプルはここで float32 にコピーするので、抜けたあとは mmap を閉じてよい
+        end = info.data_offset + info.frames * info.block_align
+        with memoryview(data) as view, view[info.data_offset:end] as raw:
+            x = _pcm_to_float(raw, info)
+    return _to_stereo(x.reshape(-1, info.channels))
+
+
+def _pcm_to_float(raw: memoryview, info: WavInfo) -> np.ndarray:
+    """data チャンクのサンプル → float32 (-1..1) のコピー (raw への参照は残さない)"""
+    tag, bits = info.format_tag, info.bits
+    if tag == WAVE_FORMAT_PCM and bits == 8:
+        x = (np.frombuffer(raw, np.uint8).astype(np.float32) - 128) / 128
+    elif tag == WAVE_FORMAT_PCM and bits == 16:
+        x = np.frombuffer(raw, "<i2").astype(np.float32) / 32768
+    elif tag == WAVE_FORMAT_PCM and bits == 24:
+        b = np.frombuffer(raw, np.uint8).reshape(-1, 3).astype(np.int32)
+        x = ((b[:, 0] << 8 | b[:, 1] << 16 | b[:, 2] << 24) >> 8).astype(np.float32) / 8388608
+    elif tag == WAVE_FORMAT_PCM and bits == 32:
+        x = np.frombuffer(raw, "<i4").astype(np.float32) / 2147483648
+    elif tag == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+        x = np.frombuffer(raw, "<f4" if bits == 32 else "<f8").astype(np.float32)
+    else:
+        raise ValueError(f"未対応の WAV フォーマットです: tag={tag:#06x}, {bits} bit")
+    return x
+
+
+def _ffmpeg_decode(src: WavSource) -> np.ndarray:
+    """ffmpeg で任意フォーマット (パス or メモリ上のファイル) を 48 kHz stereo f32le にデコード"""
+    view = None if isinstance(src, (str, Path)) else memoryview(src)
+    try:
+        proc = subprocess.run(
+            [
+                "ffmpeg", "-v", "error", "-i", "pipe:0" if view is not None else str(src),
+                "-f", "f32le", "-ac", str(CHANNELS), "-ar", str(SAMPLE_RATE), "-",
+            ],
+            input=view,
+            check=True, stdout=subprocess.PIPE,
+        )
+    finally:
+        if view is not None:
+            view.release()                     # mmap を閉じられるように
+    return np.frombuffer(proc.stdout, np.float32).reshape(-1, CHANNELS)
+
+
+@functools.lru_cache(maxsize=32)
+def _decode_cached(path: str, mtime: float) -> np.ndarray:
+    data = Path(path).read_bytes()
+    if data[:4] == b"RIFF":
+        try:
+            clip = decode_wav(data)
+        except ValueError:                     # ADPCM など未対応のもの
+            clip = _ffmpeg_decode(path)
+    else:
+        clip = _ffmpeg_decode(path)
+    clip.setflags(write=False)                 # キャッシュを共有するので読み取り専用
+    return clip
+
+
+def decode(path: str | Path) -> np.ndarray:
+    """音声ファイル → (n, 2) float32 @ SAMPLE_RATE (同じファイルは 1 回だけデコード)"""
+    return _decode_cached(str(path), os.stat(path).st_mtime)
+
+
+def duration(clip: np.ndarray) -> float:
+    return len(clip) / SAMPLE_RATE
+
+
+# ────────────────────────────
+# タイムライン
+# ────────────────────────────
+class AudioTimeline:
+    """duration 秒ぶんの stereo バッファにクリップを足し込んでいく"""
+
+    def __init__(self, duration: float):
+        self.samples = np.zeros((round(duration * SAMPLE_RATE), CHANNELS), np.float32)
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / SAMPLE_RATE
+
+    def add(
+        self,
+        clip: np.ndarray,
+        at: float = 0.0,
+        gain: float = 1.0,
+        max_dur: float | None = None,
+    ) -> None:
+        """clip を at 秒の位置に gain 倍で足す (max_dur 秒 / 末尾で切る)"""
+        start = round(at * SAMPLE_RATE)
+        if max_dur is not None:
+            clip = clip[: round(max_dur * SAMPLE_RATE)]
+        n = min(len(clip), len(self.samples) - start)
+        if n <= 0:
+            return
+        self.samples[start:start + n] += clip[:n] * gain
+
+    def add_loop(self, clip: np.ndarray, at: float = 0.0, gain: float = 1.0) -> None:
+        """clip を at 秒から末尾までループさせて足す (BGM 用)"""
+        start = round(at * SAMPLE_RATE)
+        n = len(self.samples) - start
+        if n <= 0 or len(clip) == 0:
+            return
+        reps = -(-n // len(clip))
+        self.samples[start:] += np.tile(clip, (reps, 1))[:n] * gain
+
+    def scale(self, gain: float) -> None:
+        self.samples *= gain
+
+    def write(self, path: str | Path) -> Path:
+        """16bit PCM WAV (SAMPLE_RATE / stereo) として書き出す"""
+        pcm = (np.clip(self.samples, -1.0, 1.0) * 32767).astype("<i2")
+        with wave.open(str(path), "wb") as w:
+            w.setnchannels(CHANNELS)
+            w.setsampwidth(2)
+            w.setframerate(SAMPLE_RATE)
+            w.writeframes(pcm.tobytes())
+        return Path(path)
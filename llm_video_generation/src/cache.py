@@ -0,0 +1,150 @@
+"""
+cache.py
+────────────────────────────────────────────────────────────
+実行をまたいで使うディスクキャッシュ
+
+- キーは内容のハッシュ (content-addressed)。入力が同じなら同じキーになる
+- ヒット時は mtime を更新し、サイズ上限を超えたら mtime の古い順 (LRU) に削除
+- 置き場所は LLM_VIDEO_CACHE_DIR (既定 .cache/) 配下のサブディレクトリ
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Any
+
+CACHE_ROOT = Path(os.getenv("LLM_VIDEO_CACHE_DIR", ".cache"))
+
+
+# ────────────────────────────
+# キー生成
+# ────────────────────────────
+def file_digest(path: str | Path) -> str:
+    """ファイル内容の sha256"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def digest(*parts: Any) -> str:
+    """JSON 化できる値 / bytes を並べたものの sha256"""
+    h = hashlib.sha256()
+    for p in parts:
+        if isinstance(p, (bytes, bytearray, memoryview)):
+            h.update(b"b:")
+            h.update(p)
+        else:
+            h.update(b"j:")
+            h.update(json.dumps(p, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+# ────────────────────────────
+# ファイルキャッシュ本体
+# ────────────────────────────
+class FileCache:
+    """key → 1 ファイル のディスクキャッシュ (サイズ上限付き LRU)"""
+
+    def __init__(
+        self,
+        name: str,
+        max_bytes: int,
+        suffix: str = "",
+        root: str | Path | None = None,
+    ):
+        self.dir = Path(root or CACHE_ROOT) / name
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    # --------------------------------------------------------
+    def path_for(self, key: str) -> Path:
+        return self.dir / f"{key}{self.suffix}"
+
+    def tmp_path(self, key: str) -> Path:
+        """書き込み途中用の一時パス (commit で本番パスへ rename)"""
+        return self.dir / f".{key}.{uuid.uuid4().hex}.tmp{self.suffix}"
+
+    # --------------------------------------------------------
+    def get(self, key: str) -> Path | None:
+        """ヒットならパスを返し、LRU 用に mtime を更新する"""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def commit(self, key: str, tmp: Path) -> Path:
+        """tmp_path() に書き終えたファイルを key の本番パスへ移す"""
+        path = self.path_for(key)
+        os.replace(tmp, path)
+        return path
+
+    def put_bytes(self, key: str, data: bytes) -> Path:
+        tmp = self.tmp_path(key)
+        tmp.write_bytes(data)
+        return self.commit(key, tmp)
+
+    # --------------------------------------------------------
+    def evict(self) -> int:
+        """合計サイズが max_bytes 以下になるまで古いものから削除。削除数を返す"""
+        entries = []
+        for p in self.dir.iterdir():
+            if p.name.startswith("."):
+                continue
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"{self.dir.name}: {self.hits} hit / {self.misses} miss ({rate:.0f}%)"
+
+
+# ────────────────────────────
+# ジョブディレクトリへの配置
+# ────────────────────────────
+def link_or_copy(src: str | Path, dst: str | Path) -> Path:
+    """キャッシュのファイルを dst に置く (ハードリンク、別ファイルシステムならコピー)
+
+    キャッシュ側が後で evict されても dst は残る。
+    """
+    dst = Path(dst)
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+    return dst
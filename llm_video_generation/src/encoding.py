@@ -0,0 +1,284 @@
+"""
+encoding.py
+────────────────────────────────────────────────────────────
+イントロ / 本編で共有するエンコードプロファイル
+
+- コーデック・パラメータ・タイムベース・SAR・音声レート/レイアウトを 1 か所に集約
+- 両方をこのプロファイルで書き出しておけば final.mp4 は -c copy だけで連結できる
+- probe で食い違いが見つかったファイルだけフォールバックで再エンコードする
+  (SPS / PPS も比べる: mp4 は先頭ファイルの avcC しか持たないので、PPS が違うと後ろが化ける)
+- 解像度 / fps / x264 preset は RenderProfile (full / draft / fhd) で切り替える
+  (同じ動画の部品はすべて同じプロファイルで書き出すこと)
+"""
+from __future__ import annotations
+
+import functools
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Sequence, Tuple
+
+import ffmpeg
+
+# -------------- 映像 -----------------
+VIDEO_CODEC   = "libx264"
+X264_PROFILE  = "high"
+X264_LEVEL    = "4.1"
+PIX_FMT       = "yuv420p"
+TIMESCALE     = 15360          # mp4 の video track timebase (1/15360)
+
+# -------------- 静止画向け -----------------
+# 本編のように「静止画 + 字幕」が続く映像用の x264 追加設定。GOP の長さだけを変える。
+# GOP は SPS / PPS に入らないので、通常プロファイルの映像とも -c copy で連結できる。
+# tune (stillimage など) は使わない: psy-rd が変わって PPS の chroma_qp_index_offset が
+# -2 → -4 になり、イントロと連結すると本編の色差が正しくデコードされない。
+STILL_GOP_SEC = 10             # 長い GOP (10 秒ごとにキーフレーム)
+
+# -------------- 音声 -----------------
+AUDIO_CODEC    = "aac"
+AUDIO_BITRATE  = "192k"
+SAMPLE_RATE    = 48_000
+CHANNEL_LAYOUT = "stereo"
+CHANNELS       = 2
+
+
+# ────────────────────────────
+# レンダリングプロファイル
+# ────────────────────────────
+@dataclass(frozen=True)
+class RenderProfile:
+    """出力解像度・fps・x264 preset の組
+
+    レイアウトは画面に対する比率で書き、vw() / vh() / size() で
+    このプロファイルのピクセル値に換算する。
+    """
+    name: str
+    width: int
+    height: int
+    fps: int
+    preset: str
+    # ffprobe が報告する H.264 プロファイル
+    # (ultrafast は CABAC / 8x8dct を使わないので -profile:v high でも Constrained Baseline になる)
+    probe_profile: str = "High"
+
+    def vw(self, f: float) -> int:
+        """画面幅に対する比率 → px"""
+        return round(f * self.width)
+
+    def vh(self, f: float) -> int:
+        """画面高さに対する比率 → px"""
+        return round(f * self.height)
+
+    def size(self, f: float) -> int:
+        """文字サイズ・線幅など (高さ基準, 最低 1 px)"""
+        return max(1, self.vh(f))
+
+
+FULL  = RenderProfile("full", 1280, 720, 30, "medium")
+DRAFT = RenderProfile("draft", 640, 360, 15, "ultrafast", "Constrained Baseline")  # 台本チェック用
+FHD   = RenderProfile("fhd", 1920, 1080, 30, "medium")
+
+PROFILES: Dict[str, RenderProfile] = {p.name: p for p in (FULL, DRAFT, FHD)}
+DEFAULT_PROFILE = FULL
+
+
+# ────────────────────────────
+# ffmpeg-python 用 helper
+# ────────────────────────────
+def finalize_video(stream, profile: RenderProfile = DEFAULT_PROFILE):
+    """出力直前の映像 stream を fps / SAR / pix_fmt を揃えた形にする
+
+    低フレームレートで合成した stream もここで profile.fps に水増しされる。
+    """
+    return (
+        stream
+        .filter("fps", profile.fps)
+        .filter("setsar", "1")
+        .filter("format", PIX_FMT)
+    )
+
+
+def finalize_audio(stream):
+    """出力直前の音声 stream を 48 kHz stereo に揃える"""
+    return (
+        stream
+        .filter("aresample", SAMPLE_RATE)
+        .filter("aformat", sample_rates=SAMPLE_RATE, channel_layouts=CHANNEL_LAYOUT)
+    )
+
+
+def video_kwargs(still: bool = False, profile: RenderProfile = DEFAULT_PROFILE) -> Dict[str, object]:
+    """ffmpeg.output() に渡す映像エンコード引数 (still=True で静止画向けの長い GOP)"""
+    kw: Dict[str, object] = {
+        "vcodec": VIDEO_CODEC,
+        "preset": profile.preset,
+        "profile:v": X264_PROFILE,
+        "level": X264_LEVEL,
+        "pix_fmt": PIX_FMT,
+        "r": profile.fps,
+        "video_track_timescale": TIMESCALE,
+    }
+    if still:
+        kw.update(g=profile.fps * STILL_GOP_SEC, keyint_min=profile.fps)
+    return kw
+
+
+def audio_kwargs() -> Dict[str, object]:
+    """ffmpeg.output() に渡す音声エンコード引数"""
+    return {
+        "acodec": AUDIO_CODEC,
+        "audio_bitrate": AUDIO_BITRATE,
+        "ar": SAMPLE_RATE,
+        "ac": CHANNELS,
+    }
+
+
+def output_kwargs(
+    still: bool = False,
+    profile: RenderProfile = DEFAULT_PROFILE,
+    audio: bool = True,
+    **extra,
+) -> Dict[str, object]:
+    """映像 + 音声 + mp4 の共通出力引数 (audio=False で映像のみ, extra で上書き可)"""
+    kw = {
+        **video_kwargs(still, profile), **(audio_kwargs() if audio else {}),
+        "movflags": "+faststart", "loglevel": "error",
+    }
+    kw.update(extra)
+    return kw
+
+
+# ────────────────────────────
+# probe / 互換性チェック
+# ────────────────────────────
+Signature = Tuple[Tuple[str, object], ...]
+
+
+def _probe_streams(path: str | Path) -> Tuple[dict, dict]:
+    """(映像, 音声) の先頭ストリーム情報 (extradata_hash 付き)"""
+    streams = ffmpeg.probe(str(path), show_data_hash="sha256")["streams"]
+    v = next((s for s in streams if s["codec_type"] == "video"), {})
+    a = next((s for s in streams if s["codec_type"] == "audio"), {})
+    return v, a
+
+
+@functools.lru_cache(maxsize=None)
+def reference_extradata(profile: RenderProfile = DEFAULT_PROFILE) -> str | None:
+    """このプロファイルの x264 設定で書いた映像の extradata (avcC = SPS + PPS) のハッシュ
+
+    SPS / PPS は x264 の設定だけで決まり中身に依らないので、1 フレームだけ書いて調べる。
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        ref = Path(tmp) / "reference.mp4"
+        (
+            ffmpeg
+            .input(f"color=c=black:s={profile.width}x{profile.height}:r={profile.fps}", f="lavfi")
+            .output(str(ref), vframes=1, **video_kwargs(profile=profile), loglevel="error")
+            .overwrite_output()
+            .run()
+        )
+        return _probe_streams(ref)[0].get("extradata_hash")
+
+
+def expected_signature(profile: RenderProfile = DEFAULT_PROFILE) -> Signature:
+    """このプロファイルで書き出したファイルが持つべきストリーム仕様"""
+    return (
+        ("v.codec", "h264"),
+        ("v.profile", profile.probe_profile),
+        ("v.size", (profile.width, profile.height)),
+        ("v.pix_fmt", PIX_FMT),
+        ("v.sar", "1:1"),
+        ("v.fps", f"{profile.fps}/1"),
+        ("v.time_base", f"1/{TIMESCALE}"),
+        ("v.extradata", reference_extradata(profile)),
+        ("a.codec", AUDIO_CODEC),
+        ("a.sample_rate", str(SAMPLE_RATE)),
+        ("a.channels", CHANNELS),
+    )
+
+
+def probe_signature(path: str | Path) -> Signature:
+    """ffprobe でストリーム仕様を読み、expected_signature() と同じ形で返す"""
+    v, a = _probe_streams(path)
+    return (
+        ("v.codec", v.get("codec_name")),
+        ("v.profile", v.get("profile")),
+        ("v.size", (v.get("width"), v.get("height"))),
+        ("v.pix_fmt", v.get("pix_fmt")),
+        ("v.sar", v.get("sample_aspect_ratio", "1:1")),
+        ("v.fps", v.get("r_frame_rate")),
+        ("v.time_base", v.get("time_base")),
+        ("v.extradata", v.get("extradata_hash")),
+        ("a.codec", a.get("codec_name")),
+        ("a.sample_rate", a.get("sample_rate")),
+        ("a.channels", a.get("channels")),
+    )
+
+
+def mismatches(
+    path: str | Path, profile: RenderProfile = DEFAULT_PROFILE
+) -> Dict[str, Tuple[object, object]]:
+    """プロファイルと食い違う項目 {key: (期待値, 実際の値)} を返す (空なら互換)"""
+    actual = dict(probe_signature(path))
+    return {
+        key: (want, actual.get(key))
+        for key, want in expected_signature(profile)
+        if actual.get(key) != want
+    }
+
+
+def reencode(src: str | Path, dst: str | Path, profile: RenderProfile = DEFAULT_PROFILE) -> Path:
+    """src を profile で再エンコード (フォールバック用)"""
+    inp = ffmpeg.input(str(src))
+    (
+        ffmpeg
+        .output(
+            finalize_video(inp.video.filter("scale", profile.width, profile.height), profile),
+            finalize_audio(inp.audio),
+            str(dst),
+            **output_kwargs(profile=profile),
+        )
+        .overwrite_output()
+        .run()
+    )
+    return Path(dst)
+
+
+def mux_audio(video: str | Path, audio: str | Path, dst: str | Path) -> Path:
+    """video の映像はそのまま (-c:v copy)、audio (WAV など) を AAC にして dst へ"""
+    v = ffmpeg.input(str(video)).video
+    a = ffmpeg.input(str(audio)).audio
+    (
+        ffmpeg
+        .output(
+            v, a, str(dst),
+            vcodec="copy",
+            video_track_timescale=TIMESCALE,
+            movflags="+faststart", loglevel="error",
+            **audio_kwargs(),
+        )
+        .overwrite_output()
+        .run()
+    )
+    return Path(dst)
+
+
+def concat_copy(paths: Sequence[str | Path], list_file: str | Path, dst: str | Path) -> Path:
+    """concat demuxer (-c copy) で paths を順に連結"""
+    list_file = Path(list_file)
+    list_file.write_text(
+        "".join(f"file '{Path(p).resolve().as_posix()}'\n" for p in paths),
+        encoding="utf-8",
+    )
+    (
+        ffmpeg
+        .input(str(list_file), format="concat", safe=0)
+        .output(
+            str(dst), c="copy",
+            video_track_timescale=TIMESCALE,
+            movflags="+faststart", loglevel="error",
+        )
+        .overwrite_output()
+        .run()
+    )
+    return Path(dst)
@@ -3,34 +3,40 @@ intro_video_builder.py
 ────────────────────────────────────────────────────────────
 """
 from __future__ import annotations
-import subprocess, tempfile
+import tempfile
 from itertools import accumulate
 from pathlib import Path
 from typing import List, Sequence, Optional
 import ffmpeg
 
+from llm_video_generation.src import audio_mix, encoding
+from llm_video_generation.src.encoding import RenderProfile
+from llm_video_generation.src.text_render import render_text
+
 # -------------- 画面設定 -----------------
-W, H          = 1280, 720
-FPS           = 30
-FONT_PATH     = "C:/Windows/Fonts/meiryo.ttc"
-BASE_FONT_SIZE = 90
-SUB_FONT_SIZE  = 40
+# 位置・サイズは画面に対する比率 (RenderProfile.vw / vh / size で px に換算)
+BASE_FONT_SIZE = 0.125
+SUB_FONT_SIZE  = 0.0556
 BG_COLOR      = "black@0.4"
 BG_PATH       = r"llm_video_generation/assets/background/8.png"
 CHAR_DIR = Path("llm_video_generation/assets/character/冥鳴ひまり") 
 
 FADE_DURATION = 1        # タイトルのフェード秒
-SUB_Y         = H - 140
-BOX_H         = 200
-
-CHAR_BASE_X      = 1000   # もともと指定していた位置
-CHAR_SLIDE_OFFSET = 300   # 右 (+X) にどれだけ余分に置いておくか
+TITLE_RAISE   = 0.139    # タイトルを中央からどれだけ上げるか
+TITLE_BORDER  = 0.0083
+SUB_Y         = 0.806
+SUB_BORDER    = 0.003
+SUB_SPACING   = 0.011
+SHADOW        = 0.003
+BOX_H         = 0.278
+
+CHAR_H           = 0.903  # 立ち絵の高さ
+CHAR_Y           = 0.306
+CHAR_BASE_X      = 0.781  # もともと指定していた位置
+CHAR_SLIDE_OFFSET = 0.234 # 右 (+X) にどれだけ余分に置いておくか
 SLIDE_DURATION    = 0.5   # スライドにかける秒数
 
 # -------------- 音声設定 -----------------
-SAMPLE_RATE    = 48_000
-CHANNEL_LAYOUT = "stereo"
-
 DEFAULT_BGM_VOLUME = 0.1
 DEFAULT_SE_VOLUME  = 0.6   
 # ----------------------------------------
@@ -49,56 +55,40 @@ def _extract_intro_lines(sce: dict):
     return title, lines, faces
 
 
-# ────────────────────────────
-# WAV 出力 & probe
-# ────────────────────────────
-def _write_wavs(tmp: Path, audios: Sequence[bytes]) -> List[Path]:
-    paths = []
-    for i, b in enumerate(audios):
-        p = tmp / f"voice_{i:03}.wav"
-        p.write_bytes(b); paths.append(p)
-    return paths
-
-
-def _probe_durations(wavs: Sequence[Path]) -> List[float]:
-    return [float(ffmpeg.probe(str(w))["format"]["duration"]) for w in wavs]
-
-
-def _concat_audio(wavs: Sequence[Path], dst: Path):
-    lst = dst.with_suffix(".txt")
-    lst.write_text("".join(f"file '{w.resolve()}'\n" for w in wavs), encoding="utf-8")
-    subprocess.run(
-        ["ffmpeg","-y","-f","concat","-safe","0","-i",str(lst),"-c","copy",str(dst)],
-        check=True
-    )
-
-
 # ────────────────────────────
 # 背景 + 字幕 / タイトル合成
 # ────────────────────────────
 def _build_video_bg(duration: float,
                     title: str, t_start: float,
                     lines: List[str], starts: List[float], ends: List[float],
-                    faces: List[int]):
+                    faces: List[int],
+                    p: RenderProfile = encoding.DEFAULT_PROFILE):
+    box_h  = p.vh(BOX_H)
+    shadow = p.size(SHADOW)
     v = (ffmpeg
-        .input(BG_PATH, loop=1, t=duration, framerate=FPS)
-        .filter("scale", W, H)
+        .input(BG_PATH, loop=1, t=duration, framerate=p.fps)
+        .filter("scale", p.width, p.height)
         .filter("setsar", "1")
-        .drawbox(x="(iw-w)/2", y=str(H-BOX_H), width=W, height=BOX_H,
+        .drawbox(x="(iw-w)/2", y=str(p.height-box_h), width=p.width, height=box_h,
                 color=BG_COLOR, thickness="fill"))
 
-    # ─ タイトル（フェード） ─
-    fade_expr = f"if(lt(t,{t_start+FADE_DURATION}), (t-{t_start})/{FADE_DURATION}, 1)"
-    v = v.drawtext(
-        text=title,
-        fontfile=FONT_PATH,
-        fontsize=str(BASE_FONT_SIZE),
-        fontcolor="white",
-        alpha=fade_expr,
-        x="(w-text_w)/2",
-        y="(h-text_h)/2 - 100",
-        borderw=6, bordercolor="black",
-        shadowx=2, shadowy=2, shadowcolor="black@0.5",
+    # ─ タイトル（フェード） ─  PNG を loop で伸ばし alpha フェード
+    title_png = render_text(
+        title,
+        size=p.size(BASE_FONT_SIZE),
+        color="white",
+        border_w=p.size(TITLE_BORDER), border_color="black",
+        shadow=(shadow, shadow), shadow_color="black@0.5",
+    )
+    title_v = (ffmpeg
+        .input(str(title_png), framerate=p.fps)
+        .filter("loop", loop=max(1, round(duration * p.fps)) - 1, size=1, start=0)
+        .filter("format", "rgba")
+        .filter("fade", t="in", st=t_start, d=FADE_DURATION, alpha=1))
+    v = ffmpeg.overlay(
+        v, title_v,
+        x="(main_w-overlay_w)/2",
+        y=f"(main_h-overlay_h)/2 - {p.vh(TITLE_RAISE)}",
         enable=f"gte(t,{t_start:.3f})",
     )
 
@@ -112,75 +102,78 @@ def _build_video_bg(duration: float,
 
     for fc, ivals in face_intervals.items():
         char_path = CHAR_DIR / f"{fc}.png"
-        ch = ffmpeg.input(str(char_path)).filter("scale", -1, 650)
+        ch = ffmpeg.input(str(char_path)).filter("scale", -1, p.vh(CHAR_H))
 
         # 各表情が出ている区間だけ有効化
         enable_expr = " + ".join(
-            [f"between(t,{st:.3f},{ed:.3f})" for st, ed in ivals]
+            [f"gte(t,{st:.3f})*lt(t,{ed:.3f})" for st, ed in ivals]
         )
 
         # ▼ x 座標は first_global を基準に１回だけスライド ▼
+        base_x, offset = p.vw(CHAR_BASE_X), p.vw(CHAR_SLIDE_OFFSET)
         x_expr = (
             f"if(lte(t,{first_global:.3f}),"
-            f"{CHAR_BASE_X + CHAR_SLIDE_OFFSET},"
+            f"{base_x + offset},"
             f"if(lt(t,{first_global + SLIDE_DURATION:.3f}),"
-            f"{CHAR_BASE_X + CHAR_SLIDE_OFFSET}"
-            f" - {CHAR_SLIDE_OFFSET}*(t-{first_global:.3f})/{SLIDE_DURATION},"
-            f"{CHAR_BASE_X}))"
+            f"{base_x + offset}"
+            f" - {offset}*(t-{first_global:.3f})/{SLIDE_DURATION},"
+            f"{base_x}))"
         )
 
         v = ffmpeg.overlay(
             v, ch,
             x=x_expr,
-            y=f"{H-BOX_H-300}",
+            y=str(p.vh(CHAR_Y)),
             enable=enable_expr,
         )
 
-    # ─ 字幕 ─
+    # ─ 字幕 ─  行ごとに PNG 化し、同じ文面は 1 回だけ overlay
+    sub_intervals: dict[str, list[tuple[float, float]]] = {}
     for txt, st, ed in zip(lines, starts, ends):
-        v = v.drawtext(
-            text=txt,
-            fontfile=FONT_PATH,
-            fontsize=SUB_FONT_SIZE,
-            fontcolor="white",
-            x="(w-text_w)/2",
-            y=str(SUB_Y),
-            borderw=2, bordercolor="black",
-            shadowx=2, shadowy=2, shadowcolor="black",
-            line_spacing=8,
-            enable=f"between(t,{st:.3f},{ed:.3f})",
+        sub_intervals.setdefault(txt, []).append((st, ed))
+    for txt, ivals in sub_intervals.items():
+        png = render_text(
+            txt,
+            size=p.size(SUB_FONT_SIZE),
+            color="white",
+            border_w=p.size(SUB_BORDER), border_color="black",
+            shadow=(shadow, shadow), shadow_color="black",
+            line_spacing=p.vh(SUB_SPACING),
+        )
+        v = ffmpeg.overlay(
+            v, ffmpeg.input(str(png)),
+            x="(main_w-overlay_w)/2",
+            y=str(p.vh(SUB_Y)),
+            enable=" + ".join(f"gte(t,{st:.3f})*lt(t,{ed:.3f})" for st, ed in ivals),
         )
     return v
 
 # ────────────────────────────
 # オーディオ合成
 # ────────────────────────────
-def _build_audio_mix(
-    tts_wav: Path,
-    total_sec: float,
+def _mix_audio(
+    wavs: Sequence[audio_mix.WavSource],
     starts: List[float],
+    total_sec: float,
     bgm_path: Optional[str|Path],
     se_paths: Optional[Sequence[Optional[str|Path]]],
     bgm_vol: float,
     se_vol: float,
-):
-    """tts_wav + (bgm) + (SEs) -> mixed audio stream"""
-    streams = []
+    dst: Path,
+) -> Path:
+    """TTS + (bgm) + (SEs) を足し合わせて dst (48 kHz stereo WAV) に書き出す
 
-    # ① TTS (メイン)
-    tts = ffmpeg.input(str(tts_wav))
-    streams.append(tts)
+    旧実装の amix(normalize=0) と同じく単純加算。
+    """
+    mix = audio_mix.AudioTimeline(total_sec)
+
+    # ① TTS (メイン) ― 1 行ずつデコードして足す (全行のサンプルを同時に持たない)
+    for wav, st in zip(wavs, starts):
+        mix.add(audio_mix.decode_wav(wav), st)
 
     # ② BGM ループ
     if bgm_path:
-        bgm = (
-            ffmpeg
-            .input(str(bgm_path), stream_loop=-1)
-            .filter("atrim", duration=total_sec)
-            .filter("asetpts", "N/SR/TB")
-            .filter("volume", bgm_vol)
-        )
-        streams.append(bgm)
+        mix.add_loop(audio_mix.decode(bgm_path), gain=bgm_vol)
 
     # ③ SE（タイトル＋各セリフ）
     if se_paths:
@@ -189,22 +182,9 @@ def _build_audio_mix(
         for se_path, st in zip(se_paths, starts):
             if se_path is None:
                 continue
-            delay_ms = int(st * 1000)
-            se = (
-                ffmpeg
-                .input(str(se_path))
-                .filter("adelay", f"{delay_ms}|{delay_ms}")
-                .filter("volume", se_vol)
-            )
-            streams.append(se)
-
-    # ④ mix
-    if len(streams) == 1:
-        return streams[0]       # BGM/SE 無し
-    return ffmpeg.filter(streams, "amix",
-                        inputs=len(streams),
-                        dropout_transition=0,
-                        normalize=0)
+            mix.add(audio_mix.decode(se_path), st, se_vol)
+
+    return mix.write(dst)
 
 
 # ────────────────────────────
@@ -212,13 +192,14 @@ def _build_audio_mix(
 # ────────────────────────────
 def build_intro_video(
     scenario: dict,
-    audio_bytes: List[bytes],
+    wavs: Sequence[audio_mix.WavSource],
     output_path: str | Path = "intro.mp4",
     *,
     bgm_path: str | Path | None = None,
     se_paths: Sequence[Optional[str | Path]] | None = None,
     bgm_volume: float = DEFAULT_BGM_VOLUME,
     se_volume: float = DEFAULT_SE_VOLUME,
+    profile: RenderProfile = encoding.DEFAULT_PROFILE,
 ):
     
     # ▼ ❶ ここで JSON 中の "sound" からパスを拾う ──────────
@@ -238,13 +219,11 @@ def build_intro_video(
     # --- 台本 / 尺 ---
     title, lines, faces = _extract_intro_lines(scenario)
     texts = [title, *lines]
-    if len(texts) != len(audio_bytes):
+    if len(texts) != len(wavs):
         raise ValueError("台本行数と音声数が一致しません")
 
     tmp = Path(tempfile.mkdtemp())
-    wavs = _write_wavs(tmp, audio_bytes)       # 各行 WAV
-
-    durs   = _probe_durations(wavs)
+    durs   = [audio_mix.wav_info(w).duration for w in wavs]   # RIFF ヘッダから (probe 不要)
     cum    = list(accumulate(durs))
     starts = [0.0, *cum[:-1]]
     ends   = cum
@@ -254,32 +233,27 @@ def build_intro_video(
     title, lines      = texts[0], texts[1:]
     sub_starts, sub_ends = starts[1:], ends[1:]
 
-    # --- TTS 一本化 ---
-    full_wav = tmp / "tts_full.wav"
-    _concat_audio(wavs, full_wav)
-
     # --- 映像ストリーム ---
     v_stream = _build_video_bg(
         total, title, starts[0],
         lines, sub_starts, sub_ends,
-        faces                           # ★ 追加
+        faces,                          # ★ 追加
+        profile,
     )
 
-    # --- 音声ストリーム (TTS + BGM + SE) ---
-    a_stream = _build_audio_mix(
-        full_wav, total, starts,
+    # --- 音声トラック (TTS + BGM + SE を NumPy で 1 本に) ---
+    mix_wav = _mix_audio(
+        wavs, starts, total,
         bgm_path, se_paths,
         bgm_volume, se_volume,
-    ).filter("aresample", SAMPLE_RATE)\
-    .filter("aformat", channel_layouts=CHANNEL_LAYOUT)
+        tmp / "intro_audio.wav",
+    )
+    a_stream = ffmpeg.input(str(mix_wav)).audio
 
-    # --- 出力 ---
+    # --- 出力 (本編と同じプロファイル → final.mp4 は -c copy で連結できる) ---
     (ffmpeg
-        .output(v_stream, a_stream, str(output_path),
-                vcodec="libx264", acodec="aac",
-                r=FPS, pix_fmt="yuv420p",
-                movflags="faststart",
-                loglevel="error")
+        .output(encoding.finalize_video(v_stream, profile), a_stream, str(output_path),
+                **encoding.output_kwargs(profile=profile))
         .overwrite_output()
         .run())
     out_path = Path(output_path).resolve()
@@ -302,7 +276,7 @@ if __name__ == "__main__":
     pipeline = IntroductionTTSPipeline(
         char_style={"1": "冥鳴ひまり/ノーマル"},
         tts_params={"speedScale": 1.05},
-        processes=3,
+        concurrency=4,
     )
     voices = pipeline.run(scenario, speaker="1")
 
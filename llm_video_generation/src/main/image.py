@@ -4,10 +4,16 @@ image_set.py
 構造化台本からセグメント単位で
 Pixabay に適した画像を取得するユーティリティ
 
-- 1) Pixabay へ疎通確認（ping）
-- 2) OK なら GPT でキーワード生成（50件ごとに分割）
--   2a) 失敗バッチは単発生成でフォールバック
-- 3) Pixabay で画像 URL を取得
+- 1) GPT でキーワード生成（50件ごとに分割）
+-   1a) 失敗バッチは単発生成でフォールバック
+- 2) Pixabay で画像 URL を取得
+-   検索結果は (キーワード, safesearch, per_page) ごとにディスクキャッシュ (既定 24 時間で失効)
+-   キャッシュで済まないときだけ Pixabay へ疎通確認 (ping) する。台本ごとに前回のキーワードを
+    覚えておき、その検索結果がキャッシュに揃っていなければ GPT を呼ぶ前に ping
+    (キーが無効・オフラインなら GPT のトークンを使う前に止まる)
+-   Session を使い回し (keep-alive)、スレッドで並列に検索。結果はセグメント順
+-   同じキーワードは 1 回だけ検索し、行数ぶんのヒットを取って別々の画像を割り当てる
+-   API の上限 (1 分 100 リクエスト) をトークンバケットで守り、429 は待って再試行
 """
 
 from __future__ import annotations
@@ -15,12 +21,19 @@ from __future__ import annotations
 import json
 import os
 import re
+import threading
+import time
 import urllib.parse
-from typing import List, Sequence, Iterable, Any
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Iterable, Any, Dict, Tuple
 
 from dotenv import load_dotenv
 from openai import OpenAI
 import requests
+from requests.adapters import HTTPAdapter
+
+from llm_video_generation.src.cache import FileCache, digest
 
 
 # ------------------------------------------------------------------------------
@@ -215,13 +228,110 @@ class KeywordGenerator:
 # Pixabay API 呼び出し
 # ------------------------------------------------------------------------------
 
+PIXABAY_RATE_PER_MIN = 100   # API の上限 (1 分あたりのリクエスト数)
+PIXABAY_CONCURRENCY  = 8     # 同時に投げる検索リクエスト数
+PIXABAY_MAX_RETRIES  = 4     # 429 / 5xx / 通信エラーの再試行回数
+PIXABAY_BACKOFF_SEC  = 2.0   # 再試行の待ち (Retry-After が無いとき。回数ごとに倍)
+PIXABAY_PER_PAGE     = (3, 200)  # API が受け付ける per_page の範囲
+PIXABAY_CACHE_TTL_SEC   = 24 * 60 * 60   # 検索結果キャッシュの有効期限 (Pixabay の推奨は 24 時間)
+PIXABAY_CACHE_MAX_BYTES = 64 * 1024 ** 2
+
+
+class TokenBucket:
+    """rate 個/秒 で補充され、最大 capacity 個たまるバケツ (スレッド安全)"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """トークンを 1 つ取る (無ければたまるまで待つ)"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def drain(self) -> None:
+        """429 を受けたらたまっている分を捨てる (以降は補充ペースでしか投げない)"""
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0)
+
+
+def _retry_after(resp: requests.Response) -> Optional[float]:
+    """Retry-After / X-RateLimit-Reset ヘッダの秒数"""
+    for name in ("Retry-After", "X-RateLimit-Reset"):
+        try:
+            return max(0.0, float(resp.headers[name]))
+        except (KeyError, ValueError):
+            continue
+    return None
+
+
 class PixabayFetcher:
     """Pixabay から画像 URL を取得"""
 
     _ENDPOINT = "https://pixabay.com/api/"
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        concurrency: int = PIXABAY_CONCURRENCY,
+        rate_per_min: float = PIXABAY_RATE_PER_MIN,
+        use_cache: bool = True,
+        cache_ttl: float = PIXABAY_CACHE_TTL_SEC,
+    ):
+        """
+        concurrency  : 同時に投げる検索リクエスト数 (接続プールの大きさも同じ)
+        rate_per_min : 1 分あたりのリクエスト上限 (トークンバケットの補充ペース)
+        use_cache    : False で検索結果のディスクキャッシュを使わない
+        cache_ttl    : キャッシュした検索結果を使う秒数 (過ぎたら取り直す)
+        """
         self.api_key = api_key
+        self.concurrency = max(1, concurrency)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.limiter = TokenBucket(rate_per_min / 60, capacity=self.concurrency)
+        self._online: Optional[bool] = None
+
+        self.cache_ttl = cache_ttl
+        self.cache: Optional[FileCache] = None
+        if use_cache:
+            self.cache = FileCache("pixabay", PIXABAY_CACHE_MAX_BYTES, suffix=".json")
+        # FileCache の hit は期限切れも含むので、こちらで数える
+        self.cache_hits = self.cache_misses = self.cache_expired = 0
+        self._stats_lock = threading.Lock()
+
+    def _get(self, params: dict, timeout: float) -> requests.Response:
+        """レート制限付き GET。429 / 5xx / 通信エラーは待って再試行"""
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                r = self.session.get(self._ENDPOINT, params=params, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == PIXABAY_MAX_RETRIES:
+                    raise
+                wait = None
+            else:
+                if r.status_code != 429 and r.status_code < 500 or attempt == PIXABAY_MAX_RETRIES:
+                    r.raise_for_status()
+                    return r
+                if r.status_code == 429:
+                    self.limiter.drain()
+                wait = _retry_after(r)
+            time.sleep(wait if wait is not None else PIXABAY_BACKOFF_SEC * 2 ** attempt)
+            attempt += 1
 
     def ping(self, timeout: int = 5) -> bool:
         """
@@ -235,28 +345,154 @@ class PixabayFetcher:
                 "per_page": 3,
                 "safesearch": "true",
             }
-            r = requests.get(self._ENDPOINT, params=params, timeout=timeout)
+            self.limiter.acquire()
+            r = self.session.get(self._ENDPOINT, params=params, timeout=timeout)
             r.raise_for_status()
             return True
         except requests.RequestException as e:
             print("[DEBUG] ping exception:", e)
             return False
 
-    def search_first_url(self, idx: int, query: str) -> str | None:
-        """query で最初にヒットした画像 URL (webformatURL) を返す"""
+    def ensure_online(self) -> None:
+        """初回だけ ping し、つながらなければ ConnectionError"""
+        if self._online is None:
+            self._online = self.ping()
+        if not self._online:
+            raise ConnectionError(
+                "Pixabay API に接続できません。APIキーまたはネットワークを確認してください。"
+            )
+
+    # ---------- 検索 (キャッシュ付き) ----------
+
+    def _params(self, query: str, count: int) -> dict | None:
         query = sanitize_kw(query)
         if not query:
             return None
-        params = {
+        lo, hi = PIXABAY_PER_PAGE
+        return {
             "key": self.api_key,
             "q": query,
-            "per_page": 3,
+            "per_page": min(max(count, lo), hi),
             "safesearch": "true",
         }
-        r = requests.get(self._ENDPOINT, params=params, timeout=10)
-        r.raise_for_status()
-        hits = r.json().get("hits", [])
-        return hits[0]["webformatURL"] if hits else None
+
+    @staticmethod
+    def _cache_key(params: dict) -> str:
+        # API キーは含めない (キーを替えても結果は同じ)
+        return digest("pixabay", params["q"], params["safesearch"], params["per_page"])
+
+    def _cached_entry(self, params: dict) -> Optional[dict]:
+        """キャッシュのエントリ (期限切れも含む)。無ければ None"""
+        if self.cache is None:
+            return None
+        path = self.cache.get(self._cache_key(params))
+        return json.loads(path.read_text(encoding="utf-8")) if path else None
+
+    def _is_fresh(self, entry: Optional[dict]) -> bool:
+        return entry is not None and time.time() - entry["fetched_at"] <= self.cache_ttl
+
+    def _cached_hits(self, params: dict) -> Optional[List[dict]]:
+        """キャッシュにあって期限内なら hits、無ければ None"""
+        entry = self._cached_entry(params)
+        fresh = self._is_fresh(entry)
+        with self._stats_lock:
+            if fresh:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+                self.cache_expired += entry is not None
+        return entry["hits"] if fresh else None
+
+    def _fetch_hits(self, params: dict) -> List[dict]:
+        """API で検索してキャッシュに入れる"""
+        hits = self._get(params, timeout=10).json().get("hits", [])
+        if self.cache is not None:
+            entry = {"fetched_at": time.time(), "hits": hits}
+            self.cache.put_bytes(self._cache_key(params), json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+        return hits
+
+    def cache_stats(self) -> str:
+        total = self.cache_hits + self.cache_misses
+        rate = self.cache_hits / total * 100 if total else 0.0
+        return (
+            f"pixabay: {self.cache_hits} hit / {self.cache_misses} miss ({rate:.0f}%)"
+            f", 期限切れ {self.cache_expired}"
+        )
+
+    def search_urls(self, query: str, count: int = 1) -> List[str]:
+        """query のヒット上位 count 件の画像 URL (webformatURL)"""
+        params = self._params(query, count)
+        if params is None:
+            return []
+        hits = self._cached_hits(params)
+        if hits is None:
+            self.ensure_online()
+            hits = self._fetch_hits(params)
+        return [h["webformatURL"] for h in hits[:count]]
+
+    def search_first_url(self, idx: int, query: str) -> str | None:
+        """query で最初にヒットした画像 URL (webformatURL) を返す"""
+        urls = self.search_urls(query)
+        return urls[0] if urls else None
+
+    def _plan(self, queries: Sequence[str]) -> Tuple[List[str], Counter, Dict[str, dict]]:
+        """sanitize 後のキーワード列 / キーワードごとの登場回数 / キーワードごとの検索パラメータ"""
+        keys = [sanitize_kw(q) for q in queries]
+        counts = Counter(k for k in keys if k)
+        first: Dict[str, str] = {}
+        for key, q in zip(keys, queries):
+            first.setdefault(key, q)
+        return keys, counts, {k: self._params(first[k], counts[k]) for k in counts}
+
+    def is_cached(self, queries: Sequence[str]) -> bool:
+        """search_many(queries) がキャッシュだけで済むか (ヒット数の統計には数えない)"""
+        _, _, params = self._plan(queries)
+        return all(self._is_fresh(self._cached_entry(p)) for p in params.values())
+
+    def search_many(self, queries: Sequence[str]) -> List[str | None]:
+        """queries ごとの画像 URL (戻り値は queries と同じ順)
+
+        同じキーワード (sanitize_kw 後) は 1 回だけ検索し、出てくる回数ぶんのヒットを取って
+        登場順に別々の画像を割り当てる (ヒットが足りなければ先頭から繰り返す)。
+        先にキャッシュを引き、無いものだけスレッドで並列に検索する
+        (全部キャッシュにあればネットワークには出ない)。
+        """
+        t0 = time.perf_counter()
+        keys, counts, params = self._plan(queries)
+        uniq = list(counts)
+
+        found = {k: self._cached_hits(params[k]) for k in uniq}
+        todo = [k for k in uniq if found[k] is None]
+        if todo:
+            self.ensure_online()
+        if self.concurrency == 1 or len(todo) <= 1:
+            fetched = [self._fetch_hits(params[k]) for k in todo]
+        else:
+            workers = min(self.concurrency, len(todo))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pixabay") as pool:
+                fetched = list(pool.map(lambda k: self._fetch_hits(params[k]), todo))
+        found.update(zip(todo, fetched))
+        hits = {k: [h["webformatURL"] for h in found[k][:counts[k]]] for k in uniq}
+
+        urls: List[str | None] = []
+        used: Counter = Counter()
+        for key in keys:
+            candidates = hits.get(key)
+            if not candidates:
+                urls.append(None)
+                continue
+            urls.append(candidates[used[key] % len(candidates)])
+            used[key] += 1
+
+        elapsed = time.perf_counter() - t0
+        if self.cache is not None:
+            self.cache.evict()
+            print(f"🗃 cache {self.cache_stats()}")
+        print(
+            f"🖼 Pixabay {len(queries)} 件 / 検索 {len(todo)} 回 {elapsed:.2f}s "
+            f"(ヒット {sum(u is not None for u in urls)} 件, 画像 {len(set(filter(None, urls)))} 種)"
+        )
+        return urls
 
 
 # ------------------------------------------------------------------------------
@@ -280,28 +516,46 @@ class ImageSetService:
         self,
         openai_api_key: str | None = None,
         pixabay_api_key: str | None = None,
+        use_cache: bool = True,
+        cache_ttl: float = PIXABAY_CACHE_TTL_SEC,
     ):
+        """
+        use_cache : Pixabay の検索結果をディスクキャッシュするか
+        cache_ttl : キャッシュの有効秒数 (既定 24 時間)
+        """
         load_dotenv()
         self.openai_client = OpenAI(
             api_key=openai_api_key or os.getenv("OPENAI_API_KEY")
         )
         self.keyword_gen = KeywordGenerator(self.openai_client)
-        self.pixabay = PixabayFetcher(pixabay_api_key or os.getenv("PIXABAY_API_KEY"))
+        self.pixabay = PixabayFetcher(
+            pixabay_api_key or os.getenv("PIXABAY_API_KEY"),
+            use_cache=use_cache,
+            cache_ttl=cache_ttl,
+        )
 
     # ------------------------------------------------------------------ #
     # public
     # ------------------------------------------------------------------ #
 
-    def scenario_to_images(self, scenario: dict) -> List[str | None]:
-        # 1) Pixabay に接続できるかテスト
-        if not self.pixabay.ping():
-            raise ConnectionError(
-                "Pixabay API に接続できません。APIキーまたはネットワークを確認してください。"
-            )
+    def _known_keywords(self, key: str) -> Optional[List[str]]:
+        """前回この台本で生成したキーワード (覚えていなければ None)"""
+        cache = self.pixabay.cache
+        path = cache.get(key) if cache is not None else None
+        return json.loads(path.read_text(encoding="utf-8")) if path else None
 
-        # 2) GPT でキーワード生成（50件ごとに分割 → 結合）
+    def scenario_to_images(self, scenario: dict) -> List[str | None]:
         prompts = extract_segment_prompts(scenario)
 
+        # 0) 検索結果がキャッシュに揃っている見込みが無ければ、GPT を呼ぶ前に疎通確認
+        #    (つながらなければ ConnectionError。GPT のトークンを無駄にしない)
+        scenario_key = digest("pixabay_keywords", prompts)
+        known = self._known_keywords(scenario_key)
+        if known is None or not self.pixabay.is_cached(known):
+            self.pixabay.ensure_online()
+
+        # 1) GPT でキーワード生成（50件ごとに分割 → 結合）
+
         keywords: List[str] = []
         for batch in _chunked(prompts, CHUNK_SIZE):
             part = self.keyword_gen.generate(batch)
@@ -311,9 +565,14 @@ class ImageSetService:
         if len(keywords) != len(prompts):
             # 万一ズレたら、最終フォールバック：全件単発生成で揃える
             keywords = [self.keyword_gen.generate_one(t) for t in prompts]
+        if self.pixabay.cache is not None:
+            self.pixabay.cache.put_bytes(
+                scenario_key, json.dumps(keywords, ensure_ascii=False).encode("utf-8")
+            )
 
-        # 3) Pixabay で画像 URL を取得
-        return [self.pixabay.search_first_url(idx, k) for idx, k in enumerate(keywords, 1)]
+        # 2) Pixabay で画像 URL を取得 (キャッシュに無いものがあれば先に疎通確認。
+        #    つながらなければ ConnectionError)
+        return self.pixabay.search_many(keywords)
 
 
 # ------------------------------------------------------------------------------
@@ -0,0 +1,151 @@
+"""
+image_download.py
+────────────────────────────────────────────────────────────
+台本の画像 URL をローカルファイルにする (main_video の前処理)
+
+- 同じ URL は 1 回だけダウンロード (複数行で同じ画像を使っても 1 回)
+- 本体はストリーミングでそのままディスクへ書き、書きながら sha256 を取る
+  中身が同じなら URL が違っても 1 ファイルにまとめる
+- 2 段のディスクキャッシュ (どちらもサイズ上限付き LRU)
+    image_url : URL → 画像本体のキー
+    images    : (sha256, 拡張子) → 画像本体 (content-addressed)
+  再実行やほかの台本で同じ URL / 同じ画像が出てきたらダウンロードしない
+- 拡張子は URL のパスから、無ければ GET の Content-Type から (HEAD は投げない)
+- Session を使い回し、スレッドで並列にダウンロード。戻り値は URL と同じ順
+- URL が None の行、ダウンロードに失敗した行はプレースホルダー画像
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import mimetypes
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from llm_video_generation.src.cache import FileCache, digest, link_or_copy
+
+NO_IMAGE_PATH = Path("llm_video_generation/assets/no_image.png")
+DOWNLOAD_CONCURRENCY = 8        # 同時ダウンロード数 (接続プールの大きさも同じ)
+DOWNLOAD_TIMEOUT     = 15       # 秒 (接続 / 読み込みそれぞれ)
+DOWNLOAD_CHUNK       = 1 << 16
+URL_INDEX_MAX_BYTES  = 8 * 1024 ** 2
+IMAGE_CACHE_MAX_BYTES = 1024 ** 3
+
+
+class ImageDownloader:
+    """画像 URL の列 → ローカルの画像パスの列"""
+
+    def __init__(
+        self,
+        concurrency: int = DOWNLOAD_CONCURRENCY,
+        use_cache: bool = True,
+        placeholder: str | Path = NO_IMAGE_PATH,
+    ):
+        """
+        concurrency : 同時ダウンロード数
+        use_cache   : False で実行をまたぐキャッシュを使わない (重複の除去は実行内だけ)
+        placeholder : URL が無い / 取れなかった行に使う画像
+        """
+        self.concurrency = max(1, concurrency)
+        self.placeholder = Path(placeholder)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.url_index: Optional[FileCache] = None
+        self.images: Optional[FileCache] = None
+        if use_cache:
+            self.url_index = FileCache("image_url", URL_INDEX_MAX_BYTES, suffix=".json")
+            self.images = FileCache("images", IMAGE_CACHE_MAX_BYTES)
+        self.downloaded = 0
+        self._lock = threading.Lock()
+
+    # --------------------------------------------------------
+    def _lookup(self, url: str, images: FileCache) -> Optional[Path]:
+        """URL → キャッシュ済みの画像本体 (無ければ None)"""
+        if self.url_index is None:
+            return None
+        hit = self.url_index.get(digest("image_url", url))
+        if hit is None:
+            return None
+        return images.get(json.loads(hit.read_text(encoding="utf-8"))["key"])
+
+    def _download(self, url: str, images: FileCache) -> Path:
+        """ストリーミングで images に書き込み、(sha256, 拡張子) のキーで登録"""
+        ext = Path(urlparse(url).path).suffix.lower()
+        tmp = images.tmp_path(digest("image_url", url))
+        h = hashlib.sha256()
+        try:
+            with self.session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as r:
+                r.raise_for_status()
+                if not ext:
+                    ct = r.headers.get("content-type", "").split(";")[0].strip()
+                    ext = mimetypes.guess_extension(ct) or ".jpg"
+                with open(tmp, "wb") as f:
+                    for chunk in r.iter_content(DOWNLOAD_CHUNK):
+                        h.update(chunk)
+                        f.write(chunk)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+        key = f"{h.hexdigest()}{ext}"
+        path = images.commit(key, tmp)   # 同じ中身が既にあれば同じ内容で置き換わるだけ
+        if self.url_index is not None:
+            self.url_index.put_bytes(digest("image_url", url), json.dumps({"key": key}).encode("utf-8"))
+        with self._lock:
+            self.downloaded += 1
+        return path
+
+    def _fetch_one(self, url: str, images: FileCache) -> Optional[Path]:
+        """URL → images 内の画像本体 (取れなければ None)"""
+        try:
+            return self._lookup(url, images) or self._download(url, images)
+        except requests.RequestException as exc:
+            print(f"⚠ 画像を取得できませんでした ({url}): {exc}")
+            return None
+
+    # --------------------------------------------------------
+    def fetch(self, urls: Sequence[Optional[str]], work_dir: str | Path) -> List[Path]:
+        """urls の各画像を work_dir に置いてパスを返す (URL と同じ順。無い行はプレースホルダー)"""
+        t0 = time.perf_counter()
+        work_dir = Path(work_dir)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        # キャッシュ無効でも実行内の重複除去は同じ仕組みで (置き場所が work_dir になるだけ)
+        images = self.images or FileCache("images", IMAGE_CACHE_MAX_BYTES, root=work_dir)
+        self.downloaded = 0
+
+        uniq = list(dict.fromkeys(u for u in urls if u))
+        if self.concurrency == 1 or len(uniq) <= 1:
+            found = [self._fetch_one(u, images) for u in uniq]
+        else:
+            workers = min(self.concurrency, len(uniq))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image") as pool:
+                found = list(pool.map(lambda u: self._fetch_one(u, images), uniq))
+
+        # 中身ごとに 1 回だけ work_dir へ (ファイル名は中身のハッシュ。同じ画像なら同じパス)
+        placed: Dict[Path, Path] = {
+            src: link_or_copy(src, work_dir / f"image_{src.name}")
+            for src in dict.fromkeys(filter(None, found))
+        }
+        local = {u: placed[src] for u, src in zip(uniq, found) if src is not None}
+        paths = [local.get(u) or self.placeholder for u in urls]
+
+        elapsed = time.perf_counter() - t0
+        for cache in (self.url_index, self.images):
+            if cache is not None:
+                cache.evict()
+                print(f"🗃 cache {cache.stats()}")
+        print(
+            f"🖼 画像 {len(urls)} 行: URL {len(uniq)} 種 / 中身 {len(placed)} 種 / "
+            f"ダウンロード {self.downloaded} 件 {elapsed:.2f}s"
+        )
+        return paths
@@ -3,44 +3,62 @@ from __future__ import annotations
 """
 動画生成パイプライン（dialogue + topic 転換クリップ対応）
 ------------------------------------------------------
-- 入力 : 構造化シナリオ(dict) と dialogue セグメント数分の音声 bytes[]
-- 出力 : 1280×720 / 30 fps / AAC 48 kHz stereo / H.264 MP4
+- 入力 : 構造化シナリオ(dict) と dialogue セグメント数分の音声 (WAV のパス or bytes)
+- 出力 : RenderProfile の解像度・fps (既定 1280×720 / 30 fps) / AAC 48 kHz stereo / H.264 MP4
 
 シナリオ中に `{"type": "topic", "title": "..."}` が現れたら
 その場で 3 秒の場面転換クリップ (背景 2.png + タイトル文字) を挿入する。
 
+レンダリング方式は 3 通り:
+- "timeline" : 本編全体を 1 つのフィルタグラフで組み立て 1 回だけエンコード
+               (intro_video と同じ enable=gte(t,st)*lt(t,ed) 方式)
+- "segments" : セグメントごとに映像だけの MP4 を書き出して concat → 音声を mux (旧方式)
+- "parallel" : segments と同じだが、セグメントを ffmpeg ワーカープールで並列に書き出す
+
+音声は audio_mix (NumPy) で台詞・SE・BGM を 48 kHz stereo の WAV 1 本にまとめ、
+映像には mux するだけ (どの方式でも ffmpeg に音声フィルタを回さない)。
+
+座標・サイズは画面に対する比率で書き、RenderProfile.vw() / vh() / size() で
+px に換算する (draft 640×360 でも fhd 1920×1080 でも同じレイアウトになる)。
+
 依存:
 - FFmpeg (ffmpeg-python ラッパ)
-- requests, rich
+- numpy, requests, rich
 """
 
-import mimetypes
+import functools
+import math
+import os
 import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Sequence, Optional, Dict, List
+from typing import Sequence, Optional, Dict, List, Tuple
 
-import requests
 import ffmpeg
 from rich import print
 
+from llm_video_generation.src import audio_mix, encoding
+from llm_video_generation.src.encoding import RenderProfile
+from llm_video_generation.src.cache import FileCache, digest, file_digest
+from llm_video_generation.src.text_render import render_text, resolve_font
+from llm_video_generation.src.main.image_download import ImageDownloader
+
 # ──────────────────────────────
 # グローバル設定
 # ──────────────────────────────
-W, H = 1280, 720
-FPS = 30
 DIALOGUE_DUR = 1      # dialogue セグメント長 (秒)
 TOPIC_DUR    = 3      # topic   セグメント長 (秒)
 
 BGM_PATH    = "llm_video_generation/assets/bgm/Voice.mp3"
 BGM_VOLUME  = 0.1
+BGM_DELAY   = 2.9     # BGM の開始を遅らせる秒数
 SE_TOPIC_PATH = "llm_video_generation/assets/SE/3.mp3"
 SE_VOLUME     = 0.6
 
-FONT = "C:/Windows/Fonts/meiryo.ttc"
-
-# concat で -c copy するため、すべての音声ストリーム仕様を統一
-SAMPLE_RATE   = 48_000    # Hz
-CHANNEL_LAYOUT = "stereo"
+# 旧方式の amix (normalize=1, 2 入力) と同じ音量になるよう、声 + BGM を最後に 1/2 にする
+MIX_GAIN      = 0.5
 
 # 背景画像パス
 BG_DIALOGUE = "llm_video_generation/assets/background/3.png"
@@ -49,6 +67,10 @@ BG_TOPIC    = "llm_video_generation/assets/background/2.png"
 # キャラクター画像ベースパス
 CHAR_ROOT = "llm_video_generation/assets/character"
 
+# セグメントキャッシュ (segments / parallel 方式)
+SEGMENT_CACHE_MAX_BYTES = 2 * 1024 ** 3
+SEGMENT_RENDER_REV      = 7      # セグメントの描画内容を変えたら上げる (キャッシュ無効化)
+
 # ──────────────────────────────
 # 場面転換スタイルプリセット
 # ──────────────────────────────
@@ -60,8 +82,8 @@ TOPIC_STYLES: dict[str, dict] = {
         "rect_inner": "#9DA7EB",
         "text_color": "orange",
         "char": f"{CHAR_ROOT}/ずんだもん/think.png",
-        "char_scale": 700,
-        "char_pos": (780, 50),
+        "char_w": 0.547,                 # 立ち絵の幅 (画面幅比)
+        "char_pos": (0.609, 0.069),      # 立ち絵の左上 (画面幅比, 画面高さ比)
     },
     "2": {
         "bg": "llm_video_generation/assets/background/4.png",
@@ -69,8 +91,8 @@ TOPIC_STYLES: dict[str, dict] = {
         "rect_inner": "#EC9CDB",
         "text_color": "#63C8FF",
         "char": f"{CHAR_ROOT}/四国めたん/whisper.png",
-        "char_scale": 650,
-        "char_pos": (800, 100),
+        "char_w": 0.508,
+        "char_pos": (0.625, 0.139),
     },
     "3": {
         "bg": "llm_video_generation/assets/background/6.png",
@@ -78,8 +100,8 @@ TOPIC_STYLES: dict[str, dict] = {
         "rect_inner": "#3c8ce4",
         "text_color": "orange",
         "char": f"{CHAR_ROOT}/ずんだもん/normal4.png",
-        "char_scale": 700,
-        "char_pos": (780, 50),
+        "char_w": 0.547,                 # 立ち絵の幅 (画面幅比)
+        "char_pos": (0.609, 0.069),      # 立ち絵の左上 (画面幅比, 画面高さ比)
     },
     "4": {
         "bg": "llm_video_generation/assets/background/7.png",
@@ -87,280 +109,510 @@ TOPIC_STYLES: dict[str, dict] = {
         "rect_inner": "#3c8ce4",
         "text_color": "orange",
         "char": f"{CHAR_ROOT}/ずんだもん/think.png",
-        "char_scale": 700,
-        "char_pos": (780, 50),
+        "char_w": 0.547,                 # 立ち絵の幅 (画面幅比)
+        "char_pos": (0.609, 0.069),      # 立ち絵の左上 (画面幅比, 画面高さ比)
     },
 }
 
+# ──────────────────────────────
+# レイアウト (画面比率)
+# ──────────────────────────────
+
+# speaker → (キャラ名, x, y, 左右反転)   ※ overlay はこの順 (ずんだもん → めたん)
+CHAR_LAYOUT: dict[str, tuple[str, float, float, bool]] = {
+    "2": ("ずんだもん", -0.039, 0.347, True),
+    "1": ("四国めたん", 0.742, 0.347, False),
+}
+CHAR_W = 0.3125                    # 立ち絵の幅
+
+SUB_BOX_Y, SUB_BOX_H = 0.75, 0.278     # 字幕の半透明帯
+SUB_Y         = 0.806                  # 字幕テキストの上端
+SUB_FONT      = 0.0486
+SUB_BORDER    = 0.003
+SUB_SHADOW    = 0.003
+SUB_SPACING   = 0.014
+
+IMAGE_BOX     = (0.6875, 0.667)        # 画像枠 (幅, 高さ)
+IMAGE_BOX_Y   = 0.028
+IMAGE_FIT     = (0.5625, 0.556)        # 枠内で画像を収める大きさ
+IMAGE_X       = 0.156
+
+TOPIC_FONT    = 0.0556                 # dialogue 右上のトピック名
+TOPIC_BORDER  = 0.0014
+TOPIC_MARGIN  = 0.0556
+
+# topic カード
+CARD_RECT     = (0.742, 0.792)         # 矩形 (幅, 高さ)
+CARD_SHIFT_X  = (0.0625, 0.078)        # 内側 / 外側 矩形の左シフト
+CARD_INNER_Y  = 0.028                  # 内側矩形の下シフト
+CARD_RULE_Y   = 0.472                  # 下線の位置 (矩形上端から)
+CARD_RULE_CUT = 0.027                  # 下線を内側矩形より短くする量
+CARD_RULE_H   = 0.004
+CARD_FONT_MAX, CARD_FONT_MIN, CARD_FONT_STEP = 0.104, 0.0694, 0.0139
+CARD_FONT_BASE_LEN = 11                # これより長いタイトルは文字を小さくする
+CARD_BORDER   = 0.0056
+CARD_TITLE_SHIFT = 0.078
+
 # ──────────────────────────────
 # 低レイヤ helper
 # ──────────────────────────────
 
-def _mk_background(path: str, dur: int):
-    """静止画を指定秒数ループさせる背景 video stream"""
+def _still(path: str | Path, dur: float, fps: int):
+    """静止画を 1 回だけデコードし、loop フィルタで dur 秒ぶん繰り返す video stream
+
+    overlay を挟むと fps フィルタが末尾の 1 フレームを落とすので、1 フレーム多めに作る。
+    尺は出力側で vframes を指定してフレーム単位で切る (_frame_count)。
+    """
+    frames = math.ceil(round(dur * fps, 6)) + 1
     return (
-        ffmpeg.input(path, loop=1, t=dur, framerate=FPS)
-        .filter("scale", W, H)
+        ffmpeg.input(str(path), framerate=fps)
+        .filter("loop", loop=frames - 1, size=1, start=0)
     )
 
 
-def _overlay_characters(base, faces: Dict[str, str]):
-    """ずんだもん & 四国めたん を所定位置に合成"""
-    zunda = (
-        ffmpeg.input(f"{CHAR_ROOT}/ずんだもん/{faces['2']}.png")
-        .filter("scale", 400, -1)
-        .filter("hflip")
-    )
-    base = ffmpeg.overlay(base, zunda, x=-50, y=250)
+def _frame_count(dur: float, p: RenderProfile) -> int:
+    """dur 秒を p.fps で書き出したときのフレーム数 (出力の vframes に渡す)"""
+    return max(1, round(dur * p.fps))
 
-    metan = (
-        ffmpeg.input(f"{CHAR_ROOT}/四国めたん/{faces['1']}.png")
-        .filter("scale", 400, -1)
-    )
-    return ffmpeg.overlay(base, metan, x=950, y=250)
 
+def _char_stream(speaker: str, face: str, p: RenderProfile):
+    """立ち絵 1 枚 (縮小 + 必要なら左右反転)"""
+    name, _, _, flip = CHAR_LAYOUT[speaker]
+    ch = ffmpeg.input(f"{CHAR_ROOT}/{name}/{face}.png").filter("scale", p.vw(CHAR_W), -1)
+    return ch.filter("hflip") if flip else ch
 
-def _subtitle_box(base):
-    return base.drawbox(
-        x="(iw-w)/2",
-        y=str(H - 180),
-        width=W,
-        height=200,
-        color="black@0.6",
-        thickness="fill",
-    )
 
+def _subtitle_box_layer(base, p: RenderProfile):
+    """字幕の半透明帯 (透過キャンバス上でも alpha が残るよう color ソースを overlay)"""
+    box = ffmpeg.input(f"color=c=black@0.6:s={p.width}x{p.vh(SUB_BOX_H)},format=rgba", f="lavfi")
+    return ffmpeg.overlay(base, box, x=0, y=p.vh(SUB_BOX_Y), format="rgb")
 
-def _image_asset_box(base):
+
+def _image_asset_box(base, p: RenderProfile):
     return base.drawbox(
         x="(iw-w)/2",
-        y=str(H - 700),
-        width=W - 400,
-        height=480,
+        y=str(p.vh(IMAGE_BOX_Y)),
+        width=p.vw(IMAGE_BOX[0]),
+        height=p.vh(IMAGE_BOX[1]),
         color="white@0.3",
         thickness="fill",
     )
 
 
-def _overlay_image_asset(base, url: str | Path):
-    """外部画像を 880×480 に収め中央配置"""
-    img = (
-        ffmpeg.input(str(url), loop=1, t=DIALOGUE_DUR, framerate=FPS)
-        .filter("scale", "if(gt(a,720/400),720,-1)", "if(gt(a,720/400),-1,400)")
-        .filter("pad", 880, 480, "(ow-iw)/2", "(oh-ih)/2", "black@0.0")
+def _fit_image(img, p: RenderProfile):
+    """画像 stream を画像枠の大きさにレターボックスで収める"""
+    fw, fh = p.vw(IMAGE_FIT[0]), p.vh(IMAGE_FIT[1])
+    return (
+        img
+        .filter("scale", f"if(gt(a,{fw}/{fh}),{fw},-1)", f"if(gt(a,{fw}/{fh}),-1,{fh})")
+        .filter("pad", p.vw(IMAGE_BOX[0]), p.vh(IMAGE_BOX[1]), "(ow-iw)/2", "(oh-ih)/2", "black@0.0")
     )
-    return ffmpeg.overlay(base, img, x=200, y=0)
 
 
-def _subtitle_text(base, text: str, speaker: str):
+def _overlay_image_asset(base, img_path: str | Path, p: RenderProfile):
+    """画像枠の大きさに縮小済みの素材 (_image_layer) を重ねる (1 フレーム入力 → overlay が繰り返す)"""
+    return ffmpeg.overlay(base, ffmpeg.input(str(img_path)), x=p.vw(IMAGE_X), y=0)
+
+
+def _subtitle_text(base, text: str, speaker: str, p: RenderProfile, **extra):
     border = "#E7609E" if speaker == "1" else "#6CBB5A"
-    return base.drawtext(
-        text=text,
-        fontfile=FONT,
-        fontsize=35,
-        fontcolor="white",
-        x="(w-text_w)/2",
-        y="h-140",
-        borderw=2,
-        bordercolor=border,
-        shadowcolor="black",
-        shadowx=2,
-        shadowy=2,
-        line_spacing=10,
+    shadow = p.size(SUB_SHADOW)
+    png = render_text(
+        text,
+        size=p.size(SUB_FONT),
+        color="white",
+        border_w=p.size(SUB_BORDER),
+        border_color=border,
+        shadow=(shadow, shadow),
+        shadow_color="black",
+        line_spacing=p.vh(SUB_SPACING),
+    )
+    return ffmpeg.overlay(
+        base, ffmpeg.input(str(png)),
+        x="(main_w-overlay_w)/2",
+        y=str(p.vh(SUB_Y)),
+        **extra,
     )
 
 
-def _topic_text_overlay(base, topic: str):
+def _topic_text_overlay(base, topic: str, p: RenderProfile, **extra):
     """dialogue セグメント右上に現在のトピックを表示"""
     if not topic:
         return base
-    return base.drawtext(
-        text=topic,
-        fontfile=FONT,
-        fontsize=40,
-        fontcolor="white",
-        x="w-text_w-40",
-        y="40",
-        borderw=1,
-        bordercolor="white",
-        shadowcolor="black",
-        shadowx=2,
-        shadowy=2,
+    shadow = p.size(SUB_SHADOW)
+    png = render_text(
+        topic,
+        size=p.size(TOPIC_FONT),
+        color="white",
+        border_w=p.size(TOPIC_BORDER),
+        border_color="white",
+        shadow=(shadow, shadow),
+        shadow_color="black",
+    )
+    margin = p.vh(TOPIC_MARGIN)
+    return ffmpeg.overlay(
+        base, ffmpeg.input(str(png)),
+        x=f"main_w-overlay_w-{margin}",
+        y=str(margin),
+        **extra,
     )
 
+# --------------------------------------
+# 静的レイヤの事前合成
+# --------------------------------------
+# dialogue の背景・枠・立ち絵や topic カードは毎フレーム同じなので、
+# 1 回だけ PNG に焼いておき、セグメント側ではその 1 枚を重ねるだけにする。
+
+LAYER_CACHE_MAX_BYTES = 256 * 1024 ** 2
+LAYER_REV             = 3      # レイヤの描画内容を変えたら上げる
+
+
+@functools.lru_cache(maxsize=1)
+def _layer_cache() -> FileCache:
+    return FileCache("layers", LAYER_CACHE_MAX_BYTES, suffix=".png")
+
+
+def _transparent_canvas(p: RenderProfile):
+    return ffmpeg.input(f"color=c=black@0.0:s={p.width}x{p.height},format=rgba", f="lavfi")
+
+
+def _render_layer(key: str, build) -> Path:
+    """build() が返す stream の 1 フレーム目を RGBA PNG としてキャッシュに焼く"""
+    cache = _layer_cache()
+    hit = cache.get(key)
+    if hit:
+        return hit
+    tmp = cache.tmp_path(key)
+    (
+        ffmpeg.output(build(), str(tmp), vframes=1, pix_fmt="rgba", loglevel="error")
+        .overwrite_output()
+        .run()
+    )
+    return cache.commit(key, tmp)
+
+
+@functools.lru_cache(maxsize=1)
+def _font_digests() -> Tuple[str, str]:
+    """(通常, 太字) フォントファイルの中身のハッシュ (大きいので 1 回だけ読む)"""
+    return file_digest(resolve_font()), file_digest(resolve_font(bold=True))
+
+
+@functools.lru_cache(maxsize=None)
+def _dialogue_plate(p: RenderProfile) -> Path:
+    """dialogue 背景 (BG_DIALOGUE を画面サイズに拡縮) + 画像枠 の 1 枚絵"""
+    key = digest("plate", file_digest(BG_DIALOGUE), p.width, p.height, LAYER_REV)
+    return _render_layer(
+        key,
+        lambda: _image_asset_box(ffmpeg.input(BG_DIALOGUE).filter("scale", p.width, p.height), p),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _char_pair_layer(metan_face: str, zunda_face: str, p: RenderProfile) -> Path:
+    """(めたん, ずんだもん) の表情ペア + 字幕帯 の透過 1 枚絵
+
+    字幕帯は立ち絵より手前に描かれるため、プレートではなくこちらに含める。
+    """
+    faces = {"1": metan_face, "2": zunda_face}
+    char_files = [f"{CHAR_ROOT}/{CHAR_LAYOUT[sp][0]}/{faces[sp]}.png" for sp in CHAR_LAYOUT]
+    key = digest(
+        "pair", faces, [file_digest(f) for f in char_files], CHAR_LAYOUT, CHAR_W,
+        SUB_BOX_Y, SUB_BOX_H, p.width, p.height, LAYER_REV,
+    )
+
+    def build():
+        v = _transparent_canvas(p)
+        for speaker, (_, x, y, _) in CHAR_LAYOUT.items():
+            v = ffmpeg.overlay(
+                v, _char_stream(speaker, faces[speaker], p), x=p.vw(x), y=p.vh(y), format="rgb"
+            )
+        return _subtitle_box_layer(v, p)
+
+    return _render_layer(key, build)
+
+
+@functools.lru_cache(maxsize=None)
+def _image_layer(path: Path, p: RenderProfile) -> Path:
+    """素材画像を画像枠 (IMAGE_BOX) ぴったりにレターボックスで収めた 1 枚絵
+
+    ダウンロードした原寸の画像をセグメントごとにデコード / scale / pad しないよう、
+    元画像のハッシュと枠の大きさをキーに 1 回だけ焼いておく。
+    """
+    key = digest(
+        "image", file_digest(path), IMAGE_FIT, IMAGE_BOX, p.width, p.height, LAYER_REV,
+    )
+    return _render_layer(key, lambda: _fit_image(ffmpeg.input(str(path)), p))
+
+
+@functools.lru_cache(maxsize=None)
+def _topic_card_layer(title: str, design: str, p: RenderProfile) -> Path:
+    """topic カード (背景 + 矩形 + タイトル + キャラ) の 1 枚絵"""
+    s = TOPIC_STYLES.get(design, TOPIC_STYLES["1"])
+    key = digest(
+        "topic", title, s, file_digest(s["bg"]), file_digest(s["char"]),
+        _font_digests()[1], p.width, p.height, LAYER_REV,
+    )
+    return _render_layer(key, lambda: _draw_topic_card(
+        ffmpeg.input(s["bg"]).filter("scale", p.width, p.height), ffmpeg.input(s["char"]),
+        title, s, p,
+    ))
+
+
 # --------------------------------------
 # FFmpeg graph builders
 # --------------------------------------
 
 def _build_dialogue_graph(
-    wav_path: Path,
     text: str,
     speaker: str,
     faces: Dict[str, str],
     topic: str = "",
-    img_url: str | Path | None = None,
+    img_path: str | Path | None = None,
+    dur: float = DIALOGUE_DUR,
+    p: RenderProfile = encoding.DEFAULT_PROFILE,
+    fps: int | None = None,
 ):
-    """音声付き dialogue セグメント"""
-    bg = _mk_background(BG_DIALOGUE, DIALOGUE_DUR)
-    bg = _image_asset_box(bg)
-    if img_url:
-        bg = _overlay_image_asset(bg, img_url)
-    bg = _overlay_characters(bg, faces)
-    bg = _subtitle_box(bg)
-    bg = _subtitle_text(bg, text, speaker)
-    bg = _topic_text_overlay(bg, topic)
-
-    audio = (
-        ffmpeg.input(str(wav_path))
-        .filter("aresample", SAMPLE_RATE)
-        .filter("aformat", channel_layouts=CHANNEL_LAYOUT)
-    )
-    return bg, audio
-
-def _build_topic_graph(title: str, design: str = "1"):
-    s = TOPIC_STYLES.get(design, TOPIC_STYLES["1"]) 
-
-    rect_w, rect_h = 950, 570
-    bg = _mk_background(s["bg"], TOPIC_DUR)
-
-    # 文字サイズ計算
-    max_fs, min_fs, step, base_len = 75, 50, 10, 11
-    dec = max(0, ((len(title) - base_len) // 1) * step)
+    """dur 秒の dialogue セグメント映像 (fps: 合成フレームレート, 既定は p.fps)
+
+    img_path は _image_layer で画像枠の大きさにした素材 (グラフ内では拡縮しない)。
+    """
+    bg = _still(_dialogue_plate(p), dur, fps or p.fps)
+    if img_path:
+        bg = _overlay_image_asset(bg, img_path, p)
+    pair = ffmpeg.input(str(_char_pair_layer(faces["1"], faces["2"], p)))
+    bg = ffmpeg.overlay(bg, pair, x=0, y=0)
+    bg = _subtitle_text(bg, text, speaker, p)
+    return _topic_text_overlay(bg, topic, p)
+
+
+def _draw_topic_card(bg, char, title: str, s: dict, p: RenderProfile):
+    """topic 背景 stream に 矩形 3 枚 + タイトル + キャラクター を描く"""
+    rect_w, rect_h = p.vw(CARD_RECT[0]), p.vh(CARD_RECT[1])
+    inner_x, outer_x = (p.vw(f) for f in CARD_SHIFT_X)
+
+    # 文字サイズ計算 (長いタイトルほど小さく)
+    max_fs, min_fs, step = (p.size(f) for f in (CARD_FONT_MAX, CARD_FONT_MIN, CARD_FONT_STEP))
+    dec = max(0, (len(title) - CARD_FONT_BASE_LEN) * step)
     fontsize = max(min_fs, max_fs - dec)
 
     # ----- 矩形 3 枚 -----
     bg = bg.drawbox(
-        x=f"(iw-{rect_w})/2 - 80",  y=f"(ih-{rect_h})/2 + 20",
+        x=f"(iw-{rect_w})/2 - {inner_x}",  y=f"(ih-{rect_h})/2 + {p.vh(CARD_INNER_Y)}",
         width=rect_w, height=rect_h, color=s["rect_inner"], thickness="fill",
     ).drawbox(
-        x=f"(iw-{rect_w})/2 - 100", y=f"(ih-{rect_h})/2",
+        x=f"(iw-{rect_w})/2 - {outer_x}", y=f"(ih-{rect_h})/2",
         width=rect_w, height=rect_h, color=s["rect_outer"], thickness="fill",
     ).drawbox(
-        x=f"(iw-{rect_w})/2 - 80",  y=f"(ih-{rect_h})/2 + 340",
-        width=rect_w - 35, height=3, color="white", thickness="fill",
+        x=f"(iw-{rect_w})/2 - {inner_x}",  y=f"(ih-{rect_h})/2 + {p.vh(CARD_RULE_Y)}",
+        width=rect_w - p.vw(CARD_RULE_CUT), height=p.size(CARD_RULE_H),
+        color="white", thickness="fill",
     )
 
     # ----- タイトル -----
-    bg = bg.drawtext(
-        text=title, fontfile="C:/Windows/Fonts/meiryob.ttc",
-        fontsize=fontsize, fontcolor=s["text_color"],
-        x="(w-text_w)/2 - 100", y="(h-text_h)/2",
-        borderw=4, bordercolor="white",
-        shadowcolor="black", shadowx=2, shadowy=2,
+    shadow = p.size(SUB_SHADOW)
+    png = render_text(
+        title, size=fontsize, color=s["text_color"],
+        border_w=p.size(CARD_BORDER), border_color="white",
+        shadow=(shadow, shadow), shadow_color="black", bold=True,
+    )
+    bg = ffmpeg.overlay(
+        bg, ffmpeg.input(str(png)),
+        x=f"(main_w-overlay_w)/2 - {p.vw(CARD_TITLE_SHIFT)}", y="(main_h-overlay_h)/2",
     )
 
     # ----- キャラクター -----
-    char = (
-        ffmpeg.input(s["char"], loop=1, t=TOPIC_DUR, framerate=FPS)
-        .filter("scale", s["char_scale"], -1)
-    )
+    char = char.filter("scale", p.vw(s["char_w"]), -1)
     cx, cy = s["char_pos"]
-    bg = ffmpeg.overlay(bg, char, x=cx, y=cy)
-
-    # ----- 効果音 -----
-    audio = (
-        ffmpeg.input(SE_TOPIC_PATH)
-        .filter("apad", pad_dur=TOPIC_DUR)
-        .filter("atrim", duration=TOPIC_DUR)
-        .filter("aresample", SAMPLE_RATE)
-        .filter("aformat", channel_layouts=CHANNEL_LAYOUT)
-        .filter("volume", SE_VOLUME)
-    )
+    return ffmpeg.overlay(bg, char, x=p.vw(cx), y=p.vh(cy))
 
-    return bg, audio
+
+def _build_topic_graph(
+    title: str,
+    design: str = "1",
+    p: RenderProfile = encoding.DEFAULT_PROFILE,
+    fps: int | None = None,
+    dur: float = TOPIC_DUR,
+):
+    """dur 秒 (既定 TOPIC_DUR) の場面転換カード映像 (効果音は audio_mix 側で入れる)"""
+    return _still(_topic_card_layer(title, design, p), dur, fps or p.fps)
 
 
 # ──────────────────────────────
-# 画像キャッシュ helper
+# タイムライン (single-graph) helper
 # ──────────────────────────────
 
-def _cache_images(urls: Sequence[Optional[str]], work_dir: Path) -> List[Path]:
-    """URL 画像を work_dir に保存し Path のリストを返す"""
-    cached: List[Path] = []
-    for idx, url in enumerate(urls, 1):
-        if url is None:                                 # ← URL が無い → プレースホルダー
-            cached.append(Path("llm_video_generation/assets/no_image.png"))
-            continue
-
-        ext = Path(url).suffix                         # ← URL あり
-        if not ext:
-            ct  = requests.head(url, timeout=5).headers.get("content-type", "")
-            ext = mimetypes.guess_extension(ct) or ".jpg"
-
-        path = work_dir / f"asset_{idx:03}{ext}"
-        if not path.exists():
-            r = requests.get(url, timeout=15)
-            r.raise_for_status()
-            path.write_bytes(r.content)
-        cached.append(path)
-    return cached
+@dataclass
+class _Segment:
+    """build_segments / build_timeline 共通のセグメント計画"""
+    seq_idx: int
+    kind: str                                   # "topic" | "dialogue"
+    topic: str = ""                             # topic: タイトル / dialogue: 現在のトピック
+    design: str = "1"
+    text: str = ""
+    speaker: str = ""
+    faces: Dict[str, str] = field(default_factory=dict)
+    wav: Optional[audio_mix.WavSource] = field(default=None, repr=False)   # dialogue の TTS 音声
+    img_path: Optional[Path] = None            # 画像枠の大きさに縮小済みの素材 (_image_layer)
+    dur: float = TOPIC_DUR                      # dialogue は WAV ヘッダの尺 (最短 DIALOGUE_DUR)
+    start: float = 0.0                          # 本編内の開始位置 (start / dur はフレーム境界にそろえ済み)
+
+
+def _probe_duration(path: Path) -> float:
+    """書き出した MP4 の尺 (ベンチ表示用。WAV の尺は audio_mix.wav_info を使う)"""
+    return float(ffmpeg.probe(str(path))["format"]["duration"])
+
+
+def _enable_expr(intervals: Sequence[tuple[float, float]]) -> str:
+    """区間リスト → overlay の enable 式
+
+    区間は半開区間 [st, ed)。between は両端を含むので、隣り合う区間の境界フレームで
+    前後 2 つのレイヤが同時に有効になってしまう。
+    """
+    return " + ".join(f"gte(t,{st:.3f})*lt(t,{ed:.3f})" for st, ed in intervals)
+
+
+def _build_timeline_video(
+    plan: Sequence[_Segment],
+    starts: Sequence[float],
+    ends: Sequence[float],
+    total: float,
+    p: RenderProfile = encoding.DEFAULT_PROFILE,
+    fps: int | None = None,
+):
+    """本編全体を 1 本の video stream として組み立てる (fps: 合成フレームレート, 既定は p.fps)
+
+    事前合成したプレートだけを total 秒ループさせ、画像・立ち絵ペア・字幕・
+    topic カードは 1 フレーム入力を enable (_enable_expr) で必要な区間だけ重ねる。
+    (素材画像は _image_layer で枠の大きさに縮小済み、文字は事前に PNG 化済み。グラフ内で拡縮しない)
+    """
+    # 境界はフレーム時刻ちょうどにあるので、小数 3 桁への丸めや浮動小数の誤差で
+    # 境界のフレームが前後どちらのセグメントになるかがぶれないよう、半フレーム手前で比べる
+    half = 0.5 / (fps or p.fps)
+    starts = [st - half for st in starts]
+    ends   = [ed - half for ed in ends]
+
+    dialogues = [(seg, st, ed) for seg, st, ed in zip(plan, starts, ends) if seg.kind == "dialogue"]
+    topics    = [(seg, st, ed) for seg, st, ed in zip(plan, starts, ends) if seg.kind == "topic"]
+
+    v = _still(_dialogue_plate(p), total, fps or p.fps)
+
+    # ─ 素材画像 ─  同じ画像は 1 回だけ overlay (ffmpeg-python は同一ノードを共有するため)
+    img_intervals: dict[Path, list[tuple[float, float]]] = {}
+    for seg, st, ed in dialogues:
+        if seg.img_path:
+            img_intervals.setdefault(Path(seg.img_path), []).append((st, ed))
+    for img_path, ivals in img_intervals.items():
+        v = ffmpeg.overlay(
+            v, ffmpeg.input(str(img_path)), x=p.vw(IMAGE_X), y=0, enable=_enable_expr(ivals)
+        )
+
+    # ─ 立ち絵 + 字幕帯 ─  表情ペアごとに 1 回だけ overlay
+    pair_intervals: dict[tuple[str, str], list[tuple[float, float]]] = {}
+    for seg, st, ed in dialogues:
+        pair_intervals.setdefault((seg.faces["1"], seg.faces["2"]), []).append((st, ed))
+    for pair, ivals in pair_intervals.items():
+        layer = ffmpeg.input(str(_char_pair_layer(*pair, p)))
+        v = ffmpeg.overlay(v, layer, x=0, y=0, enable=_enable_expr(ivals))
+
+    # ─ 字幕 ─  同じ台詞 (同じ PNG) は 1 回だけ overlay
+    sub_intervals: dict[tuple[str, str], list[tuple[float, float]]] = {}
+    for seg, st, ed in dialogues:
+        sub_intervals.setdefault((seg.text, seg.speaker), []).append((st, ed))
+    for (text, speaker), ivals in sub_intervals.items():
+        v = _subtitle_text(v, text, speaker, p, enable=_enable_expr(ivals))
+
+    # ─ 右上のトピック名 ─  同じトピックが続く区間をまとめて 1 回
+    topic_intervals: dict[str, list[tuple[float, float]]] = {}
+    for seg, st, ed in dialogues:
+        if seg.topic:
+            topic_intervals.setdefault(seg.topic, []).append((st, ed))
+    for topic, ivals in topic_intervals.items():
+        v = _topic_text_overlay(v, topic, p, enable=_enable_expr(ivals))
+
+    # ─ 場面転換カード ─
+    card_intervals: dict[tuple[str, str], list[tuple[float, float]]] = {}
+    for seg, st, ed in topics:
+        card_intervals.setdefault((seg.topic, seg.design), []).append((st, ed))
+    for (title, design), ivals in card_intervals.items():
+        card = ffmpeg.input(str(_topic_card_layer(title, design, p)))
+        v = ffmpeg.overlay(v, card, x=0, y=0, enable=_enable_expr(ivals))
+    return v
+
 
 # ──────────────────────────────
 # VideoAssembler
 # ──────────────────────────────
 
 class VideoAssembler:
-    """Scenario + 音声 bytes[] からフル動画を組み立てる"""
+    """Scenario + 音声 (WAV のパス or bytes) からフル動画を組み立てる"""
 
-    def __init__(self, temp_dir: str | Path | None = None):
-        self.temp_dir = Path(temp_dir) if temp_dir else Path(tempfile.mkdtemp())
-        self.temp_dir.mkdir(parents=True, exist_ok=True)
+    RENDER_MODES = ("timeline", "segments", "parallel")
 
-    # --------------------------------------------------------
-    def _write_wav(self, data: bytes, idx: int) -> Path:
-        path = self.temp_dir / f"voice_{idx:03}.wav"
-        path.write_bytes(data)
-        return path
-    
-    # --------------------------------------------------------
-    def _add_bgm(self, src: Path, dst: str | Path):
+    def __init__(
+        self,
+        temp_dir: str | Path | None = None,
+        use_cache: bool = True,
+        still: bool = True,
+        still_fps: int | None = None,
+        profile: RenderProfile = encoding.DEFAULT_PROFILE,
+    ):
         """
-        src の映像ストリームはコピーし、
-        src の音声 + ループさせた BGM を amix で重ねて dst に保存
+        still     : 静止画向けエンコード設定 (長い GOP。SPS / PPS はイントロと同じ) を使う
+        still_fps : 指定すると映像をこのフレームレートで合成し、エンコード直前に profile.fps へ水増しする
+        profile   : 出力解像度・fps・preset (encoding.FULL / DRAFT / FHD)
         """
-        v_in  = ffmpeg.input(str(src))
-        bgm_delay_ms = 2900
-
-        bgm_in = (
-            ffmpeg
-            .input(BGM_PATH, stream_loop=-1)
-            .filter("aresample", SAMPLE_RATE)
-            .filter("aformat", channel_layouts=CHANNEL_LAYOUT)
-            .filter("volume", BGM_VOLUME)
-            .filter("adelay", f"{bgm_delay_ms}|{bgm_delay_ms}")  # L/R 両チャンネルに適用
+        self.temp_dir = Path(temp_dir) if temp_dir else Path(tempfile.mkdtemp())
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_cache = (
+            FileCache("segments", SEGMENT_CACHE_MAX_BYTES, suffix=".mp4") if use_cache else None
         )
+        self.downloader = ImageDownloader(use_cache=use_cache)
+        self.still = still
+        self.profile = profile
+        self.compose_fps = min(still_fps or profile.fps, profile.fps)
 
-        mixed = ffmpeg.filter(
-            [v_in.audio, bgm_in],
-            "amix",
-            inputs=2,
-            duration="first",           # 映像の長さに合わせて BGM を切る
-            dropout_transition=3,
-        )
+    # --------------------------------------------------------
+    def _mix_audio(self, plan: Sequence[_Segment]) -> Path:
+        """本編の音声トラック (台詞 + 場面転換 SE + BGM) を WAV 1 本に書き出す
 
-        (
-            ffmpeg
-            .output(
-                v_in.video, mixed, str(dst),
-                vcodec="copy",          # 映像はコピー
-                acodec="aac",
-                movflags="faststart",
-                loglevel="error",
-            )
-            .overwrite_output()
-            .run()
-        )
+        各セグメントは映像と同じ seg.start の位置に置く (台詞は 1 行ずつデコードしてすぐ足し込む)。
+        """
+        mix = audio_mix.AudioTimeline(plan[-1].start + plan[-1].dur)
+        se = audio_mix.decode(SE_TOPIC_PATH)
+        for seg in plan:
+            if seg.kind == "topic":
+                mix.add(se, seg.start, SE_VOLUME, max_dur=seg.dur)
+            else:
+                mix.add(audio_mix.decode_wav(seg.wav), seg.start)
+        mix.add_loop(audio_mix.decode(BGM_PATH), at=BGM_DELAY, gain=BGM_VOLUME)
+        mix.scale(MIX_GAIN)
+        return mix.write(self.temp_dir / "body_audio.wav")
 
+    # --------------------------------------------------------
+    def _prepare_images(self, paths: Sequence[Path]) -> List[Path]:
+        """ダウンロードした画像を画像枠の大きさの PNG にする (同じ画像は 1 回、ffmpeg を並列に)"""
+        t0 = time.perf_counter()
+        uniq = list(dict.fromkeys(paths))
+        workers = max(1, min(os.cpu_count() or 1, len(uniq)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            layers = dict(zip(uniq, pool.map(lambda path: _image_layer(path, self.profile), uniq)))
+        print(f"🖼 画像の縮小 {len(uniq)} 枚 {time.perf_counter() - t0:.2f}s")
+        return [layers[path] for path in paths]
 
     # --------------------------------------------------------
-    def build_segments(
+    def _plan_segments(
         self,
         scenario: Dict,
-        audio_bytes: Sequence[bytes],
+        wavs: Sequence[audio_mix.WavSource],
         image_paths: Sequence[Path],
-    ) -> List[Path]:
-        """シナリオを逐次走査し、各 type に応じて MP4 セグメントを書き出す"""
-        paths: List[Path] = []
+    ) -> List[_Segment]:
+        """シナリオを逐次走査し、各セグメントの描画内容と start / dur を確定させる
+
+        start / dur は出力 fps のフレーム境界にそろえる。映像は各セグメントを整数フレームで
+        書くので、音声も同じ境界に置かないとセグメントごとの丸め誤差が積み重なってずれる。
+        境界は累積の尺から 1 回だけ丸めるため、誤差は本編全体でも 1/2 フレーム以内。
+        """
+        plan: List[_Segment] = []
         current_face = {"1": "normal1", "2": "normal1"}
         current_topic = ""
         audio_idx = 0  # dialogue ごとに消費
@@ -374,71 +626,279 @@ class VideoAssembler:
             # topic --------------------------------------------------
             if seg["type"] == "topic":
                 current_topic = seg.get("title", "")
-                design_no = seg.get("design", "1") 
-                v, a = _build_topic_graph(current_topic, design_no)
+                plan.append(_Segment(
+                    seq_idx, "topic", topic=current_topic, design=seg.get("design", "1"),
+                ))
             # dialogue ----------------------------------------------
             elif seg["type"] == "dialogue":
                 sc = seg["script"]
                 text, speaker, face = sc["text"], sc["speaker"], sc["face"]
-                if paths:
+                if plan:
                     current_face[speaker] = face
 
-                wav_path = self._write_wav(audio_bytes[audio_idx], audio_idx) if audio_bytes else Path(f"./assets/voice/{audio_idx:03}.wav")
+                wav = wavs[audio_idx] if wavs else Path(f"./assets/voice/{audio_idx:03}.wav")
                 img_path = image_paths[img_idx] if img_idx < len(image_paths) else None
 
-                v, a = _build_dialogue_graph(
-                    wav_path, text, speaker, current_face.copy(), current_topic, img_path
-                )
+                # 尺は RIFF ヘッダだけで決まる (デコードも ffprobe も不要。パスなら先頭だけ読む)
+                plan.append(_Segment(
+                    seq_idx, "dialogue", topic=current_topic, text=text, speaker=speaker,
+                    faces=current_face.copy(), wav=wav, img_path=img_path,
+                    dur=max(DIALOGUE_DUR, audio_mix.wav_info(wav).duration),
+                ))
 
                 audio_idx += 1
                 img_idx += 1
-            else:
-                continue  # 不明タイプはスキップ
-
-            out = self.temp_dir / f"seg_{seq_idx:03}.mp4"
-            (
-                ffmpeg.output(
-                    v, a, str(out),
-                    vcodec="libx264", acodec="aac",
-                    pix_fmt="yuv420p", movflags="faststart",
-                    loglevel="error",
-                ).overwrite_output().run()
+            # 不明タイプはスキップ
+
+        fps = self.profile.fps
+        raw_end, frame = 0.0, 0
+        for seg in plan:
+            raw_end += seg.dur
+            end = max(frame + 1, round(raw_end * fps))
+            seg.start, seg.dur = frame / fps, (end - frame) / fps
+            frame = end
+        return plan
+
+    # --------------------------------------------------------
+    def _segment_key(self, seg: _Segment) -> str:
+        """出力に影響する要素すべてのハッシュ (seq_idx は含めない)
+
+        背景・立ち絵・topic カードは素材パスではなく、中身のハッシュで引かれる
+        レイヤ PNG のファイル名 (= キー) を入れる。素材を同名で差し替えても別キーになる。
+        """
+        p = self.profile
+        if seg.kind == "topic":
+            content = {
+                "card": _topic_card_layer(seg.topic, seg.design, p).name,
+                "dur": round(seg.dur, 3),
+            }
+        else:
+            content = {
+                "text": seg.text,
+                "speaker": seg.speaker,
+                "plate": _dialogue_plate(p).name,
+                "pair": _char_pair_layer(seg.faces["1"], seg.faces["2"], p).name,
+                "topic": seg.topic,
+                "image": file_digest(seg.img_path) if seg.img_path else None,
+                "dur": round(seg.dur, 3),
+            }
+        fonts = _font_digests()
+        enc = [
+            encoding.output_kwargs(self.still, p, audio=False),
+            p, self.compose_fps,
+        ]
+        return digest(seg.kind, content, fonts, enc, SEGMENT_RENDER_REV)
+
+    # --------------------------------------------------------
+    def _render_segment(self, seg: _Segment, threads: int | None = None) -> Path:
+        """1 セグメントの映像を seg_XXX.mp4 に書き出す (threads: x264 のスレッド数)
+
+        音声は含めない (_mix_audio の WAV を最後に mux する)。
+        キャッシュが有効なら、同じ内容のセグメントは前回の MP4 を再利用する。
+        台詞の音声が変わっても長さが同じなら映像はそのまま再利用できる。
+        """
+        if self.segment_cache is None:
+            return self._encode_segment(seg, self.temp_dir / f"seg_{seg.seq_idx:03}.mp4", threads)
+
+        key = self._segment_key(seg)
+        hit = self.segment_cache.get(key)
+        if hit:
+            return hit
+        tmp = self._encode_segment(seg, self.segment_cache.tmp_path(key), threads)
+        return self.segment_cache.commit(key, tmp)
+
+    def _encode_segment(self, seg: _Segment, out: Path, threads: int | None = None) -> Path:
+        if seg.kind == "topic":
+            v = _build_topic_graph(seg.topic, seg.design, self.profile, self.compose_fps, seg.dur)
+        else:
+            v = _build_dialogue_graph(
+                seg.text, seg.speaker, seg.faces, seg.topic, seg.img_path, seg.dur,
+                self.profile, self.compose_fps,
             )
-            paths.append(out)
+
+        extra = {"vframes": _frame_count(seg.dur, self.profile)}
+        if threads:
+            extra["threads"] = threads
+        (
+            ffmpeg.output(
+                encoding.finalize_video(v, self.profile), str(out),
+                **encoding.output_kwargs(self.still, self.profile, audio=False, **extra),
+            ).overwrite_output().run()
+        )
+        return out
+
+    # --------------------------------------------------------
+    def build_segments(self, plan: Sequence[_Segment], workers: int | None = 1) -> List[Path]:
+        """計画済みの各セグメントを映像だけの MP4 に書き出す (seg.dur は確定済みであること)
+
+        workers > 1 なら ffmpeg プロセスを最大 workers 本並列に走らせる。
+        workers=None は CPU コア数 (セグメント数が上限)。
+        コアを奪い合わないよう x264 のスレッド数は コア数 / workers に絞る。
+        戻り値は並列時もシナリオ順。
+        """
+        cores = os.cpu_count() or 1
+        if workers is None:
+            workers = min(cores, len(plan))
+        if workers <= 1:
+            paths = [self._render_segment(seg) for seg in plan]
+        else:
+            threads = max(1, cores // workers)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                paths = list(pool.map(lambda seg: self._render_segment(seg, threads), plan))
+
+        if self.segment_cache is not None:
+            # 今回使ったものは mtime が新しいので、消えるのは古い実行の残りから
+            self.segment_cache.evict()
+            print(f"🗃 cache {self.segment_cache.stats()}")
         return paths
 
     # --------------------------------------------------------
     def concat(self, seg_files: List[Path], output: str | Path):
         """concat demuxer (-c copy) で結合"""
-        list_file = self.temp_dir / "concat_list.txt"
-        with list_file.open("w", encoding="utf-8") as f:
-            for p in seg_files:
-                f.write(f"file '{p.resolve()}'\n")
+        encoding.concat_copy(seg_files, self.temp_dir / "concat_list.txt", output)
 
+    # --------------------------------------------------------
+    def build_timeline(
+        self,
+        plan: Sequence[_Segment],
+        audio_path: Path,
+        output: str | Path,
+    ) -> Path:
+        """本編全体を 1 つのフィルタグラフ・1 回のエンコードで output に書き出す
+
+        dialogue は音声の長さ (seg.dur) だけ静止画を表示し、音声は audio_path をそのまま mux。
+        """
+        starts = [seg.start for seg in plan]
+        total  = plan[-1].start + plan[-1].dur
+        ends   = [*starts[1:], total]
+
+        v = _build_timeline_video(plan, starts, ends, total, self.profile, self.compose_fps)
+        a = ffmpeg.input(str(audio_path)).audio
         (
-            ffmpeg.input(str(list_file), format="concat", safe=0)
-            .output(str(output), c="copy", loglevel="error")
-            .overwrite_output()
-            .run()
+            ffmpeg.output(
+                encoding.finalize_video(v, self.profile), a, str(output),
+                **encoding.output_kwargs(
+                    self.still, self.profile, vframes=_frame_count(total, self.profile),
+                ),
+            ).overwrite_output().run()
         )
+        return Path(output)
 
     # --------------------------------------------------------
     def build_full_video(
         self,
         scenario: Dict,
-        audio_bytes: Sequence[bytes],
+        wavs: Sequence[audio_mix.WavSource],
         image_urls: Sequence[str],
         output_path: str | Path = "output.mp4",
+        mode: str = "timeline",
+        workers: int | None = None,
     ) -> Path:
-        """シナリオ + 音声 + 画像 URL から output_path に MP4 を生成"""
-        local_images = _cache_images(image_urls, self.temp_dir)
+        """シナリオ + 音声 + 画像 URL から output_path に MP4 を生成
+
+        wavs は dialogue 順の TTS 音声。WAV ファイルのパスを渡せば必要になるまで読まない。
+
+        mode="timeline" : 1 グラフ / 1 エンコード
+        mode="segments" : セグメントごとにエンコード → concat → 音声を mux
+        mode="parallel" : segments を workers 本の ffmpeg で並列エンコード (None はコア数)
+        """
+        if mode not in self.RENDER_MODES:
+            raise ValueError(f"未知のレンダリング方式です: {mode}")
+
+        local_images = self.downloader.fetch(image_urls, self.temp_dir / "images")
+        plan = self._plan_segments(scenario, wavs, self._prepare_images(local_images))
+        if not plan:
+            raise ValueError("描画できるセグメントがありません")
+
+        t0 = time.perf_counter()
+        # ① 音声トラック
+        audio_path = self._mix_audio(plan)
+        if mode == "timeline":
+            self.build_timeline(plan, audio_path, output_path)
+        else:
+            # ② セグメント生成 → ③ 連結
+            segs = self.build_segments(plan, workers=workers if mode == "parallel" else 1)
+
+            concat_path = self.temp_dir / "concat.mp4"
+            self.concat(segs, concat_path)
+
+            # ④ 音声を mux して最終出力
+            encoding.mux_audio(concat_path, audio_path, output_path)
+        print(f"⏱ body render ({mode}, {self.profile.name}): {time.perf_counter() - t0:.2f}s")
+        return Path(output_path)
+
+
+# ──────────────────────────────
+# レンダリング方式の比較
+# ──────────────────────────────
+
+def compare_render_modes(
+    scenario: Dict,
+    wavs: Sequence[audio_mix.WavSource],
+    image_urls: Sequence[str],
+    out_dir: str | Path = "render_bench",
+) -> Dict[str, float]:
+    """同じ入力を全レンダリング方式で書き出し、wall time と尺を並べて表示"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    results: Dict[str, float] = {}
+    for mode in VideoAssembler.RENDER_MODES:
+        out = out_dir / f"body_{mode}.mp4"
+        t0 = time.perf_counter()
+        VideoAssembler().build_full_video(scenario, wavs, image_urls, out, mode=mode)
+        results[mode] = time.perf_counter() - t0
+        print(f"{mode:>9}: {results[mode]:7.2f}s  (duration {_probe_duration(out):.2f}s) → {out}")
+    return results
+
+
+# 比較するエンコード設定: 名前 → VideoAssembler の引数
+ENCODE_PROFILES: Dict[str, Dict] = {
+    "default":        {"still": False},
+    "still":          {"still": True},
+    "still+10fps":    {"still": True, "still_fps": 10},
+}
+
+
+def compare_encode_profiles(
+    scenario: Dict,
+    wavs: Sequence[audio_mix.WavSource],
+    image_urls: Sequence[str],
+    out_dir: str | Path = "render_bench",
+    mode: str = "timeline",
+) -> Dict[str, tuple[float, int]]:
+    """ENCODE_PROFILES ごとに同じ本編を書き出し、エンコード時間と出力サイズを比較表示"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    results: Dict[str, tuple[float, int]] = {}
+    for name, kwargs in ENCODE_PROFILES.items():
+        out = out_dir / f"body_{name}.mp4"
+        asm = VideoAssembler(use_cache=False, **kwargs)
+        t0 = time.perf_counter()
+        asm.build_full_video(scenario, wavs, image_urls, out, mode=mode)
+        results[name] = (time.perf_counter() - t0, out.stat().st_size)
+
+    base_t, base_size = results["default"]
+    print(f"{'profile':>12} {'time':>9} {'size':>10}  (vs default)")
+    for name, (t, size) in results.items():
+        print(
+            f"{name:>12} {t:8.2f}s {size / 1024 ** 2:8.2f}MB"
+            f"  ({t / base_t * 100:5.1f}% time, {size / base_size * 100:5.1f}% size)"
+        )
+    return results
+
 
-        # ② セグメント生成 → ③ 連結
-        segs = self.build_segments(scenario, audio_bytes, local_images)
+if __name__ == "__main__":
+    import json
+    import pickle
 
-        concat_path = self.temp_dir / "concat.mp4"
-        self.concat(segs, concat_path)
+    # main_tts.py / image.py の __main__ が保存した音声・画像 URL を使う
+    scenario = json.loads(Path("llm_video_generation/src/main/s.json").read_text(encoding="utf-8"))
+    with open("llm_video_generation/src/v.pkl", "rb") as f:
+        wavs = pickle.load(f)
+    with open("llm_video_generation/src/i.pkl", "rb") as f:
+        image_urls = pickle.load(f)
 
-        # ④ BGM を重ねて最終出力
-        self._add_bgm(concat_path, output_path)
-        return Path(output_path)
\ No newline at end of file
+    compare_render_modes(scenario, wavs, image_urls)
+    compare_encode_profiles(scenario, wavs, image_urls)
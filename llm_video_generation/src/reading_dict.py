@@ -0,0 +1,78 @@
+"""
+reading_dict.py
+────────────────────────────────────────────────────────────
+読み生成 (LLM) の前に通すローカルの読み辞書
+
+- 辞書ファイル (JSON: 表記 → ひらがな読み) で英字・略語を置き換える
+  英字の表記は前後が英字でないときだけ一致 ("AI" は "AIR" の一部には当たらない)
+- 置き換え後に英字が残らない行は LLM に送らない (needs_llm)
+- user_dict_words() は VoiceVox の /user_dict_word に登録する形 (表記, カタカナ読み)
+- 辞書ファイルは LLM_VIDEO_READING_DICT (既定 assets/reading_dict.json)
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+DEFAULT_DICT_PATH = Path(
+    os.getenv("LLM_VIDEO_READING_DICT", "llm_video_generation/assets/reading_dict.json")
+)
+
+# LLM に任せる必要がある文字 (英字。全角英字も含む)
+_LATIN = re.compile(r"[A-Za-zＡ-Ｚａ-ｚ]")
+
+
+def hiragana_to_katakana(text: str) -> str:
+    return "".join(chr(ord(c) + 0x60) if "ぁ" <= c <= "ゖ" else c for c in text)
+
+
+def strip_sentence_end(text: str) -> str:
+    """読み生成と同じく文末の「。」を落とす"""
+    return text.rstrip().rstrip("。")
+
+
+class ReadingDictionary:
+    """表記 → ひらがな読み の置換辞書"""
+
+    def __init__(self, entries: Dict[str, str] | None = None):
+        self.entries = {k: v for k, v in (entries or {}).items() if k and v}
+        self._pattern: re.Pattern | None = None
+        if self.entries:
+            # 長い表記を先に試す ("CPU使用率" と "CPU" なら前者)
+            alts = []
+            for surface in sorted(self.entries, key=len, reverse=True):
+                p = re.escape(surface)
+                if _LATIN.match(surface[0]):
+                    p = r"(?<![A-Za-z])" + p
+                if _LATIN.match(surface[-1]):
+                    p = p + r"(?![A-Za-z])"
+                alts.append(p)
+            self._pattern = re.compile("|".join(alts))
+
+    @classmethod
+    def load(cls, path: str | Path | None = None) -> "ReadingDictionary":
+        """辞書ファイルを読む (無ければ空の辞書)"""
+        path = Path(path) if path else DEFAULT_DICT_PATH
+        if not path.is_file():
+            return cls()
+        return cls(json.loads(path.read_text(encoding="utf-8")))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def apply(self, text: str) -> str:
+        if self._pattern is None:
+            return text
+        return self._pattern.sub(lambda m: self.entries[m.group(0)], text)
+
+    @staticmethod
+    def needs_llm(text: str) -> bool:
+        """置き換え後もまだ LLM で読みを決める必要がある文字が残っているか"""
+        return bool(_LATIN.search(text))
+
+    def user_dict_words(self) -> List[Tuple[str, str]]:
+        """VoiceVox のユーザー辞書用 (表記, カタカナ読み)"""
+        return [(surface, hiragana_to_katakana(reading)) for surface, reading in self.entries.items()]
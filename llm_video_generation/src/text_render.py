@@ -0,0 +1,140 @@
+"""
+text_render.py
+────────────────────────────────────────────────────────────
+字幕・タイトル文字を Python 側 (Pillow) で 1 回だけ透過 PNG に描き、
+ffmpeg には静止画として overlay させるためのユーティリティ
+
+- drawtext のように毎フレーム freetype でラスタライズしない
+- (text, font, size, 色, 縁取り, 影, 行間) をキーにディスクキャッシュ
+- フォントは環境変数 → Windows → Linux → macOS の順に探すので
+  C:/Windows/Fonts が無い Linux のレンダリングノードでも動く
+"""
+from __future__ import annotations
+
+import functools
+import math
+import os
+from pathlib import Path
+from typing import Tuple
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+from llm_video_generation.src.cache import FileCache, digest
+
+TEXT_CACHE_MAX_BYTES = 128 * 1024 ** 2
+
+# ────────────────────────────
+# フォント解決
+# ────────────────────────────
+FONT_CANDIDATES = [
+    "C:/Windows/Fonts/meiryo.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/fonts-japanese-gothic.ttf",
+    "/System/Library/Fonts/ヒラギノ角ゴシック W4.ttc",
+]
+BOLD_FONT_CANDIDATES = [
+    "C:/Windows/Fonts/meiryob.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Bold.ttc",
+    "/usr/share/fonts/google-noto-cjk/NotoSansCJK-Bold.ttc",
+    "/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc",
+]
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_font(bold: bool = False) -> str:
+    """使えるフォントファイルのパスを返す
+
+    LLM_VIDEO_FONT / LLM_VIDEO_FONT_BOLD が指定されていればそれを優先。
+    太字が見つからなければ通常フォントで代用する。
+    """
+    env = os.getenv("LLM_VIDEO_FONT_BOLD" if bold else "LLM_VIDEO_FONT")
+    candidates = [env] if env else []
+    candidates += BOLD_FONT_CANDIDATES if bold else FONT_CANDIDATES
+    for c in candidates:
+        if c and Path(c).is_file():
+            return c
+    if bold:
+        return resolve_font(False)
+    raise FileNotFoundError(
+        "字幕用フォントが見つかりません。LLM_VIDEO_FONT にフォントファイルのパスを指定してください。"
+    )
+
+
+# ────────────────────────────
+# 描画
+# ────────────────────────────
+def _rgba(color: str) -> Tuple[int, int, int, int]:
+    """ffmpeg 形式の色 ("white", "#E7609E", "black@0.5") → RGBA"""
+    name, _, alpha = color.partition("@")
+    r, g, b = ImageColor.getrgb(name)[:3]
+    a = round(float(alpha) * 255) if alpha else 255
+    return r, g, b, a
+
+
+@functools.lru_cache(maxsize=1)
+def _text_cache() -> FileCache:
+    return FileCache("text", TEXT_CACHE_MAX_BYTES, suffix=".png")
+
+
+@functools.lru_cache(maxsize=32)
+def _font(path: str, size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(path, size)
+
+
+def render_text(
+    text: str,
+    *,
+    size: int,
+    color: str = "white",
+    border_w: int = 0,
+    border_color: str = "black",
+    shadow: Tuple[int, int] = (0, 0),
+    shadow_color: str = "black",
+    line_spacing: int = 0,
+    bold: bool = False,
+) -> Path:
+    """text を縁取り・影付きで透過 PNG に描き、そのパスを返す (キャッシュ付き)
+
+    画像サイズは文字・縁取り・影がちょうど収まる大きさ。
+    overlay 側では drawtext の text_w / text_h の代わりに overlay_w / overlay_h を使う。
+    """
+    font_path = resolve_font(bold)
+    st = os.stat(font_path)
+    key = digest(
+        text, size, color, border_w, border_color, list(shadow), shadow_color, line_spacing,
+        font_path, st.st_size, int(st.st_mtime),
+    )
+    cache = _text_cache()
+    hit = cache.get(key)
+    if hit:
+        return hit
+
+    font = _font(font_path, size)
+    probe = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+    bbox = probe.multiline_textbbox(
+        (0, 0), text, font=font, spacing=line_spacing, align="center", stroke_width=border_w
+    )
+    left, top = math.floor(bbox[0]), math.floor(bbox[1])
+    right, bottom = math.ceil(bbox[2]), math.ceil(bbox[3])
+    sx, sy = shadow
+    w = right - left + abs(sx)
+    h = bottom - top + abs(sy)
+    img = Image.new("RGBA", (max(1, w), max(1, h)), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+
+    # 本体の描画原点 (影が負方向のときはその分ずらす)
+    ox, oy = -left + max(0, -sx), -top + max(0, -sy)
+    common = dict(font=font, spacing=line_spacing, align="center", stroke_width=border_w)
+    if sx or sy:
+        sc = _rgba(shadow_color)
+        draw.multiline_text((ox + sx, oy + sy), text, fill=sc, stroke_fill=sc, **common)
+    draw.multiline_text(
+        (ox, oy), text, fill=_rgba(color), stroke_fill=_rgba(border_color), **common
+    )
+
+    tmp = cache.tmp_path(key)
+    img.save(tmp, format="PNG")
+    return cache.commit(key, tmp)
@@ -0,0 +1,343 @@
+"""
+tts.py
+────────────────────────────────────────────────────────────
+イントロ / 本編 / 結論の台詞をまとめて音声にする TTS サービス
+
+- シナリオの全台詞 (イントロのタイトル + 本文、本編の対話、結論) を 1 回で集める
+- ひらがな読み生成は全台詞で 1 パス
+  まずローカルの読み辞書 (reading_dict.py) で英字・略語を置き換え、英字が残らない行は
+  LLM に送らない。LLM で作った読みは行ごとにディスクキャッシュ (再実行では LLM を呼ばない)
+  残りだけを LLM へ:
+  READ_CHUNK_SIZE 行ずつのチャンクに分けて並列に投げ、検証に落ちたチャンクだけ再試行。
+  それでも駄目なチャンクは 1 行ずつ、最後は原文のまま (順序は常に台本順)
+- VoiceVox クライアント (スタイル表・接続プール・キャッシュ・同時数の自動調整) も 1 つを共有し、
+  全セクションを 1 回の synthesize_many で合成する
+- 結果はセクションごと (TTSResult.intro / .body) に台本順で返す
+  out_dir を渡すと WAV は "{セクション}_{連番}.wav" に書き出してパスを返す
+  (全行の WAV をメモリに持たない。動画側はパスをそのまま mmap して読む)
+- イントロと本編で同じ話者キー ("1" など) を別キャラに割り当てられるよう、
+  内部では "セクション:話者" をキーにする
+
+intro_tts.IntroductionTTSPipeline / main_tts.TTSPipeline はこのサービスの薄いラッパ。
+"""
+from __future__ import annotations
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from dotenv import load_dotenv
+from openai import OpenAI
+
+from llm_video_generation.src.cache import FileCache, digest
+from llm_video_generation.src.reading_dict import ReadingDictionary, strip_sentence_end
+from llm_video_generation.src.voicevox import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_HOST,
+    VoiceVoxTTS,
+)
+
+READ_CHUNK_SIZE  = 20          # 1 リクエストで読みを生成する行数
+READ_CONCURRENCY = 4           # 同時に投げるチャンク数
+READING_CACHE_MAX_BYTES = 16 * 1024 ** 2
+
+INTRO = "intro"
+BODY  = "body"
+SECTIONS = (INTRO, BODY)
+
+
+# ────────────────────────────
+# 台本ユーティリティ
+# ────────────────────────────
+def extract_dialogues_with_speaker(scenario: dict) -> List[Tuple[str, str]]:
+    """本編 + 結論の (text, speaker) を id 昇順で返す"""
+    dialogs: List[Tuple[str, str]] = [
+        (seg["script"]["text"], seg["script"]["speaker"])
+        for seg in sorted(scenario["segments"], key=lambda s: s["id"])
+        if seg["type"] == "dialogue"
+    ]
+
+    # ── 結論パート ───────────────────────────
+    if "conclusion" in scenario and "text" in scenario["conclusion"]:
+        for item in scenario["conclusion"]["text"]:
+            if item.get("type") == "dialogue":
+                script = item["script"]
+                dialogs.append((script["text"], script["speaker"]))
+
+    return dialogs
+
+
+def extract_intro_texts(scenario: dict) -> List[str]:
+    """イントロのタイトル + 本文 (script フィールド)"""
+    intro = scenario.get("introduction", {})
+    title = intro.get("title", "")
+    lines = [
+        item.get("script", "")
+        for item in intro.get("text", [])
+        if isinstance(item, dict)
+    ]
+    return [title, *lines] if title else lines
+
+
+# ────────────────────────────
+# ひらがな読み生成 (LLM)
+# ────────────────────────────
+class ReadGenerator:
+    """OpenAI で漢字かな混在文をひらがなに変換"""
+
+    _PROMPT =  '''
+        以下の要件に厳密に従い、与えられた日本語セリフの配列を同じ順序・要素数の配列に変換してください。
+
+        1. 出力は JSON 配列（[…]）のみとし、説明文や余計な文字は一切含めない。
+        2. 機械的な TTS で誤読が起こりそうな箇所「英字」、「略語」、をひらがなに変換する。
+        3. 誤読リスクが低い漢字はそのまま維持する。
+        4. ひらがな・カタカナ部分はそのまま維持する。
+        5. 文末の「。」は入力の有無にかかわらずすべて削除する。
+        6. 文字数やトークン数を制限せず、正確な読み仮名を最優先する。
+
+        ――――――
+        【入力例】
+        [
+        "こんにちは、今日のテーマはAIです。",
+        "次に、最適化の話をしましょう。"
+        ]
+
+        【期待する出力】
+        [
+        "こんにちは、今日のテーマはえーあいです",
+        "次に、最適化の話をしましょう"
+        ]
+    '''
+
+    def __init__(
+        self,
+        model: str = "gpt-4.1",
+        chunk_size: int = READ_CHUNK_SIZE,
+        concurrency: int = READ_CONCURRENCY,
+        dictionary: ReadingDictionary | None = None,
+        use_cache: bool = True,
+    ):
+        """
+        dictionary : LLM の前に当てる読み辞書 (省略時は既定の辞書ファイル)
+        use_cache  : LLM で作った読みを行ごとにディスクキャッシュするか
+        """
+        load_dotenv()
+        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.model = model
+        self.chunk_size = max(1, chunk_size)
+        self.concurrency = max(1, concurrency)
+        self.dictionary = dictionary if dictionary is not None else ReadingDictionary.load()
+        self.cache = (
+            FileCache("readings", READING_CACHE_MAX_BYTES, suffix=".json") if use_cache else None
+        )
+
+    def generate(self, texts: Sequence[str], max_retry: int = 3) -> List[str]:
+        """texts と同じ順序・要素数の読みを返す
+
+        辞書で済む行・キャッシュにある行はそのまま、残りだけ LLM で生成する。
+        """
+        prepared = [self.dictionary.apply(t) for t in texts]
+        readings: List[Optional[str]] = [None] * len(prepared)
+        keys: Dict[int, str] = {}
+        n_dict = n_cache = 0
+        for i, text in enumerate(prepared):
+            if not self.dictionary.needs_llm(text):
+                readings[i] = strip_sentence_end(text)
+                n_dict += 1
+                continue
+            if self.cache is not None:
+                keys[i] = digest("reading", self.model, self._PROMPT, text)
+                hit = self.cache.get(keys[i])
+                if hit:
+                    readings[i] = json.loads(hit.read_text(encoding="utf-8"))
+                    n_cache += 1
+
+        pending = [i for i, r in enumerate(readings) if r is None]
+        generated = self._generate_llm([prepared[i] for i in pending], max_retry)
+        for i, reading in zip(pending, generated):
+            if reading is None:
+                print(f"⚠ 読み生成に失敗したので原文のまま使います: {texts[i]}")
+                readings[i] = strip_sentence_end(prepared[i])
+                continue
+            readings[i] = reading
+            if i in keys:
+                self.cache.put_bytes(keys[i], json.dumps(reading, ensure_ascii=False).encode("utf-8"))
+
+        if self.cache is not None:
+            self.cache.evict()
+        total = len(prepared)
+        skipped = n_dict + n_cache
+        print(
+            f"📖 読み {total} 行: 辞書で完結 {n_dict} / キャッシュ {n_cache} / LLM {len(pending)}"
+            f" (LLM 省略 {skipped / total * 100 if total else 0:.0f}%)"
+        )
+        return readings
+
+    def _generate_llm(self, texts: List[str], max_retry: int) -> List[Optional[str]]:
+        """chunk_size 行ずつ並列に LLM で生成 (失敗した行は None)"""
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        if len(chunks) <= 1 or self.concurrency == 1:
+            results = [self._generate_chunk(c, max_retry) for c in chunks]
+        else:
+            workers = min(self.concurrency, len(chunks))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reading") as pool:
+                results = list(pool.map(lambda c: self._generate_chunk(c, max_retry), chunks))
+        return [reading for chunk in results for reading in chunk]
+
+    def _generate_chunk(self, texts: List[str], max_retry: int) -> List[Optional[str]]:
+        """1 チャンク分。検証に落ちたら再試行 → 1 行ずつ → None (呼び出し側で原文のまま)"""
+        data = self._request(texts, max_retry)
+        if data is not None:
+            return data
+        if len(texts) == 1:
+            return [None]
+        return [self._generate_chunk([t], max_retry)[0] for t in texts]
+
+    def _request(self, texts: List[str], max_retry: int) -> List[str] | None:
+        """最大 max_retry 回問い合わせ、要素数・型が合う応答を返す (全滅なら None)"""
+        payload = json.dumps(texts, ensure_ascii=False)
+        user_msg = f"要素数 {len(texts)} のリストです。同じ数で返してください。\n{payload}"
+
+        for _ in range(max_retry):
+            reply = self._chat(user_msg)
+            try:
+                data = json.loads(reply)
+            except json.JSONDecodeError:
+                continue
+            if (
+                isinstance(data, list) and len(data) == len(texts)
+                and all(isinstance(d, str) for d in data)
+            ):
+                return data
+        return None
+
+    def _chat(self, user_content: str) -> str:
+        resp = self.client.chat.completions.create(
+            model=self.model,
+            temperature=1.0,
+            top_p=0.95,
+            messages=[
+                {"role": "system", "content": self._PROMPT.strip()},
+                {"role": "user", "content": user_content},
+            ],
+        )
+        return resp.choices[0].message.content.strip()
+
+
+# ────────────────────────────
+# サービス本体
+# ────────────────────────────
+@dataclass
+class TTSResult:
+    """セクションごとの WAV (台本順)。out_dir 指定時はファイルのパス、無ければ bytes"""
+    intro: List[Union[bytes, Path]] = field(default_factory=list, repr=False)
+    body: List[Union[bytes, Path]] = field(default_factory=list, repr=False)
+
+
+class TTSService:
+    """シナリオ dict → セクションごとの音声bytes"""
+
+    def __init__(
+        self,
+        intro_char_style: Dict[str, str] | None = None,
+        body_char_style: Dict[str, str] | None = None,
+        tts_params: Dict[str, float] | None = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        use_cache: bool = True,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        hosts: str | Sequence[str] = DEFAULT_HOST,
+        adaptive: bool = True,
+        intro_speaker: str = "1",
+        reading_dict: str | Path | None = None,
+        sync_user_dict: bool = False,
+    ):
+        """
+        intro_char_style / body_char_style : 話者キー → "キャラ名/スタイル名" (セクションごと)
+        concurrency   : VoiceVox の 1 ホストへ同時に投げる合成リクエスト数 (adaptive なら初期値)
+        hosts         : エンジンの URL (リストなら処理中の少ないホストへ振り分け)
+        adaptive      : 応答時間を見て同時リクエスト数を自動調整するか
+        use_cache     : audio_query / WAV のディスクキャッシュを使うか
+        batch_size    : >1 で同じ話者の行を /multi_synthesis にまとめる件数
+        intro_speaker : イントロを読む話者キー (イントロは 1 人)
+        reading_dict  : 読み辞書ファイル (省略時は reading_dict.DEFAULT_DICT_PATH)
+        sync_user_dict: 読み辞書を VoiceVox のユーザー辞書 (/user_dict_word) にも登録するか
+        """
+        self.char_styles = {INTRO: intro_char_style or {}, BODY: body_char_style or {}}
+        self.tts_params = tts_params or {}
+        self.concurrency = concurrency
+        self.use_cache = use_cache
+        self.batch_size = batch_size
+        self.hosts = hosts
+        self.adaptive = adaptive
+        self.intro_speaker = intro_speaker
+        self.dictionary = ReadingDictionary.load(reading_dict)
+        self.sync_user_dict = sync_user_dict
+
+    @staticmethod
+    def _key(section: str, speaker: str) -> str:
+        return f"{section}:{speaker}"
+
+    def _lines(self, scenario: dict, sections: Sequence[str]) -> List[Tuple[str, str, str]]:
+        """(section, text, speaker) を セクション順 → 台本順 で"""
+        lines: List[Tuple[str, str, str]] = []
+        if INTRO in sections:
+            lines += [(INTRO, text, self.intro_speaker) for text in extract_intro_texts(scenario)]
+        if BODY in sections:
+            lines += [(BODY, text, speaker) for text, speaker in extract_dialogues_with_speaker(scenario)]
+        return lines
+
+    def run(
+        self,
+        scenario: dict,
+        sections: Sequence[str] = SECTIONS,
+        out_dir: str | Path | None = None,
+    ) -> TTSResult:
+        """out_dir を渡すと WAV をそこへ書き出し、TTSResult にはパスが入る"""
+        lines = self._lines(scenario, sections)
+        result = TTSResult()
+        if not lines:
+            return result
+
+        # 読み生成は全セクションで 1 回 (辞書 / キャッシュで済む行は LLM に送らない)
+        reader = ReadGenerator(dictionary=self.dictionary, use_cache=self.use_cache)
+        readings = reader.generate([text for _, text, _ in lines])
+
+        # クライアントは 1 つ (スタイル表の取得も 1 回)。全セクションを同じスレッド / 接続で合成
+        char_style = {
+            self._key(section, speaker): style
+            for section in sections
+            for speaker, style in self.char_styles[section].items()
+        }
+        tts = VoiceVoxTTS(
+            host=self.hosts,
+            char_style=char_style,
+            params=self.tts_params,
+            concurrency=self.concurrency,
+            use_cache=self.use_cache,
+            batch_size=self.batch_size,
+            adaptive=self.adaptive,
+        )
+        if self.sync_user_dict and len(self.dictionary):
+            tts.sync_user_dict(self.dictionary.user_dict_words())
+        items = [
+            (reading, self._key(section, speaker))
+            for reading, (section, _, speaker) in zip(readings, lines)
+        ]
+        if out_dir is None:
+            wavs = tts.synthesize_many(items)
+        else:
+            out_dir = Path(out_dir)
+            out_dir.mkdir(parents=True, exist_ok=True)
+            dsts, counts = [], dict.fromkeys(sections, 0)
+            for section, _, _ in lines:
+                dsts.append(out_dir / f"{section}_{counts[section]:03}.wav")
+                counts[section] += 1
+            wavs = tts.synthesize_to(items, dsts)
+
+        for (section, _, _), wav in zip(lines, wavs):
+            getattr(result, section).append(wav)
+        return result
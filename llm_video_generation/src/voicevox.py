@@ -0,0 +1,658 @@
+"""
+voicevox.py
+────────────────────────────────────────────────────────────
+VoiceVox エンジンのクライアント (イントロ / 本編の TTS で共有)
+
+- requests.Session を使い回し、keep-alive で TCP 接続を再利用する
+- エンジンは複数ホストを束ねられる (EnginePool)
+    処理中リクエストが最も少ないホストへ送り、ホストごとの同時数は AdaptiveLimit で制限
+    接続エラー / タイムアウト / 5xx のホストはしばらく外して別ホストで再試行
+    最後の 1 ホストは外さず、間隔を空けて同じホストで再試行 (回数は ENGINE_RETRIES まで)
+    起動時に全ホストのスタイル表を突き合わせ、食い違えばエラー
+    /version や /speakers に応答しないホストは (時間で戻さず) プールから取り除く
+- /speakers のスタイル表はエンジンのバージョンごとにディスクキャッシュ
+  (実行ごと・行ごとに /speakers を叩かない)
+- 合成は HTTP 待ちだけなのでスレッドで並列化 (プロセス起動も WAV の pickle も無い)
+  結果は入力順で返す
+- ホストあたりの同時リクエスト数は応答時間を見て自動調整 (AIMD)
+    concurrency から始め、応答が無負荷時並みなら 1 ずつ増やし (max_concurrency まで)
+    遅くなったりエラーが出たら倍率で縮める。最終値と行/秒は実行ログに出す
+- 合成結果は 2 段のディスクキャッシュ (どちらもサイズ上限付き LRU)
+    tts_query : (読み, style ID, エンジンのバージョン) → audio_query の JSON
+    tts_wav   : (audio_query, tts_params, style ID, バージョン) → WAV
+  台本が同じなら再実行で HTTP を呼ばず、speedScale などを変えただけなら
+  /audio_query を飛ばして /synthesis だけ呼ぶ
+- synthesize_to() は WAV をメモリに溜めずに 1 行 1 ファイルで書き出す
+  (キャッシュにある WAV はハードリンクで置くのでコピーも読み込みもしない)
+- sync_user_dict() で読み辞書を全ホストのユーザー辞書 (/user_dict_word) に登録できる
+  (登録内容は audio_query のキャッシュキーにも入る。同期できなかったホストは使わない)
+- 出力はミックスと同じ 48 kHz (OUTPUT_PARAMS)。24 kHz を後からリサンプルしない
+- batch_size > 1 なら style ID ごとに batch_size 件ずつ /multi_synthesis (zip) にまとめる
+  (/synthesis の往復を減らす。最適値はホスト次第なので compare_batch_sizes で測る)
+"""
+from __future__ import annotations
+
+import functools
+import io
+import json
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from llm_video_generation.src import encoding
+from llm_video_generation.src.cache import FileCache, digest, link_or_copy
+
+DEFAULT_HOST = "http://localhost:50021"
+DEFAULT_CONCURRENCY = 4        # ホストあたりの同時リクエスト数 (自動調整の初期値)
+MAX_CONCURRENCY = 16           # 自動調整の上限 (ホストあたり)
+LATENCY_TOLERANCE = 2.0        # 応答時間 (平滑化後) が無負荷時の何倍までなら「詰まっていない」か
+LATENCY_SMOOTHING = 0.2        # 応答時間の指数移動平均の重み
+LATENCY_BACKOFF = 0.75         # 応答が遅くなったときの縮小率
+ERROR_BACKOFF = 0.5            # エラー時の縮小率
+ENGINE_EJECT_SEC = 30.0        # エラーを返したホストを外しておく秒数
+ENGINE_RETRIES = 4             # 1 リクエストあたり、ホスト数に加えて再試行する回数
+ENGINE_RETRY_BACKOFF = 0.5     # 外さなかったホストへ再試行するまでの待ち (回数ごとに倍)
+DEFAULT_BATCH_SIZE = 1         # 1 = 行ごとに /synthesis
+STYLE_CACHE_MAX_BYTES = 4 * 1024 ** 2
+QUERY_CACHE_MAX_BYTES = 64 * 1024 ** 2
+WAV_CACHE_MAX_BYTES   = 1024 ** 3
+# 合成はミックスと同じ 48 kHz で出させる (audio_mix 側でリサンプルしない)。
+# outputStereo は使わない: エンジンは L/R に同じ振幅で複製するので、
+# audio_mix の mono → stereo (-3 dB, swresample と同じ) より 3 dB 大きくなる
+OUTPUT_PARAMS = {"outputSamplingRate": encoding.SAMPLE_RATE}
+
+
+# ────────────────────────────
+# セッション / スタイル表
+# ────────────────────────────
+def make_session(pool_size: int = 8, hosts: int = 1) -> requests.Session:
+    """keep-alive 接続をプールする Session (ホストごとに pool_size 本)"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max(1, hosts), pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def engine_version(session: requests.Session, host: str) -> str:
+    """GET /version (例: "0.14.5")"""
+    return str(session.get(f"{host}/version", timeout=10).json())
+
+
+@functools.lru_cache(maxsize=1)
+def _style_cache() -> FileCache:
+    return FileCache("voicevox", STYLE_CACHE_MAX_BYTES, suffix=".json")
+
+
+def fetch_style_map(
+    session: requests.Session, host: str, version: str | None = None
+) -> Dict[str, int]:
+    """"キャラ名/スタイル名" → style ID の表 (エンジンのバージョンが同じ間はキャッシュを使う)"""
+    key = digest("speakers", host, version or engine_version(session, host))
+    cache = _style_cache()
+    hit = cache.get(key)
+    if hit:
+        return json.loads(hit.read_text(encoding="utf-8"))
+
+    style_map: Dict[str, int] = {}
+    for c in session.get(f"{host}/speakers", timeout=30).json():
+        for st in c["styles"]:
+            style_map[f"{c['name']}/{st['name']}"] = st["id"]
+    cache.put_bytes(key, json.dumps(style_map, ensure_ascii=False).encode("utf-8"))
+    return style_map
+
+
+# ────────────────────────────
+# 同時リクエスト数の自動調整
+# ────────────────────────────
+class AdaptiveLimit:
+    """1 ホストの同時リクエスト上限 (AIMD)
+
+    - API (path) ごとに応答時間の指数移動平均をとり、その最小値を無負荷時の応答時間とみなす
+    - 平均が無負荷時 × LATENCY_TOLERANCE 以内で、上限まで使っているなら
+      1 / limit ずつ増やす (limit 件成功するごとに +1)
+    - それより遅ければ LATENCY_BACKOFF 倍、エラーなら ERROR_BACKOFF 倍に縮める
+      (同じ混雑で返ってきた並行リクエストが一斉に縮めないよう、縮めるのは 1 往復に 1 回)
+    - adaptive=False なら initial のまま固定
+    呼び出し側 (EnginePool) のロック内で使う。
+    """
+
+    def __init__(self, initial: int, maximum: int = MAX_CONCURRENCY, adaptive: bool = True):
+        self.maximum = max(1, maximum) if adaptive else max(1, initial)
+        self.value = float(min(max(1, initial), self.maximum))
+        self.adaptive = adaptive
+        self.peak = self.current
+        self._avg: Dict[str, float] = {}
+        self._baseline: Dict[str, float] = {}
+        self._last_backoff = 0.0
+
+    @property
+    def current(self) -> int:
+        return max(1, int(self.value))
+
+    def on_success(self, path: str, latency: float, inflight: int) -> None:
+        """inflight: このリクエストを含む、応答時点の処理中リクエスト数"""
+        if not self.adaptive:
+            return
+        prev = self._avg.get(path, latency)
+        avg = prev + (latency - prev) * LATENCY_SMOOTHING
+        self._avg[path] = avg
+        baseline = min(self._baseline.get(path, avg), avg)
+        self._baseline[path] = baseline
+        if avg > baseline * LATENCY_TOLERANCE:
+            self._decrease(LATENCY_BACKOFF, avg)
+        elif inflight >= self.current:
+            self.value = min(self.maximum, self.value + 1 / self.value)
+            self.peak = max(self.peak, self.current)
+
+    def on_error(self) -> None:
+        if self.adaptive:
+            self._decrease(ERROR_BACKOFF, 0.0)
+
+    def _decrease(self, factor: float, window: float) -> None:
+        now = time.monotonic()
+        if now - self._last_backoff < window:
+            return
+        self._last_backoff = now
+        self.value = max(1.0, self.value * factor)
+
+
+def _zenkaku(text: str) -> str:
+    """ASCII の表示文字を全角に (VoiceVox のユーザー辞書が表記を保存する形)"""
+    return "".join(chr(ord(c) + 0xFEE0) if "!" <= c <= "~" else c for c in text)
+
+
+# ────────────────────────────
+# エンジンプール
+# ────────────────────────────
+@dataclass
+class _Engine:
+    url: str
+    limit: AdaptiveLimit
+    version: str = ""
+    outstanding: int = 0           # 処理中のリクエスト数
+    ejected_until: float = 0.0     # time.monotonic() がこれを超えるまで使わない
+    served: int = 0
+    errors: int = 0
+
+
+class EnginePool:
+    """複数の VoiceVox エンジンへのリクエストを振り分ける (1 ホストでも同じ経路)"""
+
+    def __init__(
+        self,
+        hosts: str | Sequence[str],
+        session: requests.Session,
+        per_host: int = DEFAULT_CONCURRENCY,
+        max_per_host: int = MAX_CONCURRENCY,
+        adaptive: bool = True,
+    ):
+        """per_host: ホストあたりの同時リクエスト数 (adaptive なら初期値, max_per_host が上限)"""
+        urls = [hosts] if isinstance(hosts, str) else list(hosts)
+        if not urls:
+            raise ValueError("VoiceVox のホストが指定されていません")
+        self.engines = [
+            _Engine(u.rstrip("/"), AdaptiveLimit(per_host, max_per_host, adaptive))
+            for u in dict.fromkeys(urls)
+        ]
+        self.session = session
+        self._version: Optional[str] = None
+        self._cond = threading.Condition()
+
+    # --------------------------------------------------------
+    def _eject(self, engine: _Engine, exc: Exception) -> bool:
+        """engine をしばらく外す。ほかに健全なホストが無ければ外さない (外したら True)"""
+        with self._cond:
+            now = time.monotonic()
+            newly = engine.ejected_until <= now     # 同時に失敗した他のリクエスト分は表示しない
+            others = any(e is not engine and e.ejected_until <= now for e in self.engines)
+            engine.errors += 1
+            engine.limit.on_error()
+            if others:
+                engine.ejected_until = now + ENGINE_EJECT_SEC
+            self._cond.notify_all()
+        if not others:
+            print(f"⚠ VoiceVox {engine.url} でエラー (ほかに使えるホストが無いので再試行): {exc}")
+        elif newly:
+            print(f"⚠ VoiceVox {engine.url} を {ENGINE_EJECT_SEC:.0f} 秒外します: {exc}")
+        return others
+
+    def drop(self, engine: _Engine, reason: str | Exception) -> None:
+        """engine をプールから取り除く (時間で戻る _eject と違い、以後このホストは使わない)
+
+        バージョンやスタイル表を確かめられなかったホストを合成に回さないために使う。
+        """
+        with self._cond:
+            self.engines = [e for e in self.engines if e is not engine]
+            self._version = None            # キャッシュキーは残ったホストから作り直す
+            self._cond.notify_all()
+        print(f"⚠ VoiceVox {engine.url} を使いません: {reason}")
+
+    def _acquire(self) -> _Engine:
+        """空きのある健全なホストのうち処理中が最少のもの
+
+        全ホストが外れていれば、最初に戻るホストの ejected_until まで待つ。
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                healthy = [e for e in self.engines if e.ejected_until <= now]
+                if not healthy:
+                    self._cond.wait(timeout=min(e.ejected_until for e in self.engines) - now)
+                    continue
+                free = [e for e in healthy if e.outstanding < e.limit.current]
+                if free:
+                    engine = min(free, key=lambda e: e.outstanding)
+                    engine.outstanding += 1
+                    return engine
+                # 全ホストが上限まで使用中 → 空くまで待つ
+                self._cond.wait(timeout=1.0)
+
+    def _release(self, engine: _Engine, path: str, latency: float | None) -> None:
+        """latency=None は失敗 (上限の調整は _eject 側)"""
+        with self._cond:
+            if latency is not None:
+                engine.served += 1
+                engine.limit.on_success(path, latency, engine.outstanding)
+            engine.outstanding -= 1
+            self._cond.notify_all()
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """path を 1 ホストへ送る。ホスト側の失敗なら外して別ホストで再試行
+
+        外せない (最後の 1 つの) ホストには ENGINE_RETRY_BACKOFF から倍々に待って再試行する。
+        試行はホスト数 + ENGINE_RETRIES 回まで。
+        4xx はリクエスト側の問題なのでホストは外さずそのまま例外にする。
+        """
+        last_exc: Exception | None = None
+        backoff = ENGINE_RETRY_BACKOFF
+        attempts = len(self.engines) + ENGINE_RETRIES
+        for attempt in range(1, attempts + 1):
+            engine = self._acquire()
+            t0 = time.perf_counter()
+            try:
+                resp = self.session.request(method, f"{engine.url}{path}", **kwargs)
+                if resp.status_code >= 500:
+                    resp.raise_for_status()
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as exc:
+                self._release(engine, path, None)
+                if not self._eject(engine, exc) and attempt < attempts:
+                    time.sleep(backoff)
+                    backoff *= 2
+                last_exc = exc
+                continue
+            self._release(engine, path, time.perf_counter() - t0)
+            resp.raise_for_status()
+            return resp
+        raise RuntimeError(f"VoiceVox への {path} が再試行しても失敗しました") from last_exc
+
+    # --------------------------------------------------------
+    def _probe_versions(self) -> None:
+        """各ホストの GET /version (応答しないホストは取り除く。1 つも残らなければ RuntimeError)"""
+        for engine in list(self.engines):
+            if not engine.version:
+                try:
+                    engine.version = engine_version(self.session, engine.url)
+                except requests.RequestException as exc:
+                    self.drop(engine, exc)
+        if not self.engines:
+            raise RuntimeError("/version に応答する VoiceVox エンジンがありません")
+
+    @property
+    def version(self) -> str:
+        """キャッシュキー用のバージョン (ホスト間で違えば "+" で連結)"""
+        if self._version is None:
+            self._probe_versions()
+            self._version = "+".join(sorted({e.version for e in self.engines}))
+        return self._version
+
+    def style_map(self) -> Dict[str, int]:
+        """全ホストのスタイル表を取得して突き合わせる (食い違えば RuntimeError)
+
+        スタイル表を取れなかったホストは取り除く (確かめていないホストへは合成を送らない)。
+        """
+        self._probe_versions()
+        maps: Dict[str, Dict[str, int]] = {}
+        for engine in list(self.engines):
+            try:
+                maps[engine.url] = fetch_style_map(self.session, engine.url, engine.version)
+            except requests.RequestException as exc:
+                self.drop(engine, exc)
+        if not maps:
+            raise RuntimeError("スタイル表を取得できる VoiceVox エンジンがありません")
+
+        base_url, base = next(iter(maps.items()))
+        for url, other in maps.items():
+            diff = sorted(k for k in base.keys() | other.keys() if base.get(k) != other.get(k))
+            if diff:
+                raise RuntimeError(
+                    f"VoiceVox {url} のスタイル表が {base_url} と一致しません: {', '.join(diff[:5])}"
+                )
+        return base
+
+    @property
+    def max_inflight(self) -> int:
+        """全ホスト合計の同時リクエスト数の上限 (スレッド数の目安)"""
+        return sum(e.limit.maximum for e in self.engines)
+
+    def stats(self) -> str:
+        return ", ".join(
+            f"{e.url}: 同時 {e.limit.current} (最大 {e.limit.peak}), {e.served} req / {e.errors} err"
+            for e in self.engines
+        )
+
+
+# ────────────────────────────
+# クライアント
+# ────────────────────────────
+class VoiceVoxTTS:
+    """VoiceVox API ラッパ – 単文を wav bytes へ"""
+
+    def __init__(
+        self,
+        host: str | Sequence[str] = DEFAULT_HOST,
+        char_style: Dict[str, str] | None = None,
+        default_style: str = "ノーマル",
+        params: Dict[str, float] | None = None,
+        speaker_map: Dict[str, int] | None = None,
+        session: requests.Session | None = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        use_cache: bool = True,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_concurrency: int = MAX_CONCURRENCY,
+        adaptive: bool = True,
+    ):
+        """
+        host            : エンジンの URL、または複数ホストのリスト (EnginePool で振り分け)
+        speaker_map     : 解決済みの 話者キー → style ID。渡すと /speakers を呼ばない
+        session         : 共有する Session (省略時はホストごとに max_concurrency 本の接続をプール)
+        concurrency     : ホストあたりの同時リクエスト数 (adaptive なら初期値)
+        use_cache       : False で audio_query / WAV のディスクキャッシュを使わない
+        batch_size      : synthesize_many で 1 回の /multi_synthesis にまとめる行数 (1 で無効)
+        max_concurrency : 自動調整の上限 (ホストあたり)
+        adaptive        : False で concurrency に固定
+        """
+        hosts = [host] if isinstance(host, str) else list(host)
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        pool_size = max(self.concurrency, max_concurrency) if adaptive else self.concurrency
+        self.session = session or make_session(pool_size, len(hosts))
+        self.pool = EnginePool(hosts, self.session, self.concurrency, max_concurrency, adaptive)
+        self.params = {**OUTPUT_PARAMS, **(params or {})}
+        self._user_dict_tag = ""           # sync_user_dict で登録した内容 (キャッシュキー用)
+
+        self.query_cache: Optional[FileCache] = None
+        self.wav_cache: Optional[FileCache] = None
+        if use_cache:
+            self.query_cache = FileCache("tts_query", QUERY_CACHE_MAX_BYTES, suffix=".json")
+            self.wav_cache = FileCache("tts_wav", WAV_CACHE_MAX_BYTES, suffix=".wav")
+
+        if speaker_map is not None:
+            self.style_id_map: Dict[str, int] = {}
+            self.speaker_map = dict(speaker_map)
+            return
+
+        # スタイル名→ID 変換表 (全ホストで一致していること)
+        self.style_id_map = self.pool.style_map()
+
+        # ユーザ入力 (キャラクター/スタイル) → speaker_id
+        self.speaker_map = {}
+        if char_style:
+            for name, ns in char_style.items():
+                if ns in self.style_id_map:
+                    self.speaker_map[name] = self.style_id_map[ns]
+                else:
+                    alt = f"{ns}/{default_style}"
+                    self.speaker_map[name] = self.style_id_map.get(alt, 1)
+
+    @property
+    def version(self) -> str:
+        """エンジンのバージョン (キャッシュキー用, 初回だけ各ホストに GET /version)"""
+        return self.pool.version
+
+    def audio_query(self, text: str, speaker_id: int) -> dict:
+        """POST /audio_query (tts_params を当てる前の素の query)"""
+        key = None
+        if self.query_cache is not None:
+            parts = ("audio_query", text, speaker_id, self.version)
+            key = digest(*parts, self._user_dict_tag) if self._user_dict_tag else digest(*parts)
+            hit = self.query_cache.get(key)
+            if hit:
+                return json.loads(hit.read_text(encoding="utf-8"))
+
+        query = self.pool.request(
+            "POST", "/audio_query",
+            params={"text": text, "speaker": speaker_id},
+            timeout=30,
+        ).json()
+
+        if key is not None:
+            self.query_cache.put_bytes(key, json.dumps(query, ensure_ascii=False).encode("utf-8"))
+        return query
+
+    def sync_user_dict(self, words: Sequence[Tuple[str, str]], accent_type: int = 0) -> int:
+        """(表記, カタカナ読み) を全ホストのユーザー辞書に登録 / 更新。変更した件数を返す
+
+        同期できなかったホストはプールから取り除く (辞書の無いホストの読みが
+        「辞書あり」のキーで query キャッシュに入らないように)。全ホストで失敗したら RuntimeError。
+        """
+        changed = 0
+        failed: List[Tuple[_Engine, Exception]] = []
+        for engine in list(self.pool.engines):
+            try:
+                existing = {
+                    w["surface"]: (uuid, w["pronunciation"])
+                    for uuid, w in self.session.get(f"{engine.url}/user_dict", timeout=10).json().items()
+                }
+                for surface, pronunciation in words:
+                    params = {
+                        "surface": surface, "pronunciation": pronunciation, "accent_type": accent_type,
+                    }
+                    # エンジン側は表記を全角で保存する
+                    uuid, current = existing.get(_zenkaku(surface), (None, None))
+                    if uuid is None:
+                        self.session.post(
+                            f"{engine.url}/user_dict_word", params=params, timeout=10
+                        ).raise_for_status()
+                    elif current != pronunciation:
+                        self.session.put(
+                            f"{engine.url}/user_dict_word/{uuid}", params=params, timeout=10
+                        ).raise_for_status()
+                    else:
+                        continue
+                    changed += 1
+            except requests.RequestException as exc:
+                failed.append((engine, exc))
+        if len(failed) == len(self.pool.engines):
+            raise RuntimeError("どの VoiceVox エンジンにもユーザー辞書を同期できませんでした") from failed[-1][1]
+        for engine, exc in failed:
+            self.pool.drop(engine, f"ユーザー辞書を同期できませんでした: {exc}")
+        self._user_dict_tag = digest(sorted(words))
+        return changed
+
+    def _cached_wav(self, query: dict, speaker_id: int) -> Tuple[Optional[str], Optional[Path]]:
+        """WAV キャッシュのキーとヒットしたファイル (キャッシュ無効ならどちらも None)"""
+        if self.wav_cache is None:
+            return None, None
+        key = digest("synthesis", query, self.params, speaker_id, self.version)
+        return key, self.wav_cache.get(key)
+
+    def _store(self, key: Optional[str], wav: bytes, dst: Optional[Path]) -> Union[bytes, Path]:
+        """合成した WAV をキャッシュに入れ、dst があればそこへ置いてパスを返す"""
+        if key is not None:
+            cached = self.wav_cache.put_bytes(key, wav)
+            if dst is not None:
+                return link_or_copy(cached, dst)
+        if dst is None:
+            return wav
+        dst.write_bytes(wav)
+        return dst
+
+    def synthesize(self, text: str, speaker_name: str) -> bytes:
+        return self._synthesize(text, speaker_name, None)
+
+    def synthesize_file(self, text: str, speaker_name: str, dst: str | Path) -> Path:
+        """1 行を合成して dst に書き出す"""
+        return self._synthesize(text, speaker_name, Path(dst))
+
+    def _synthesize(self, text: str, speaker_name: str, dst: Optional[Path]) -> Union[bytes, Path]:
+        speaker_id = self.speaker_map.get(speaker_name, 1)
+
+        query = self.audio_query(text, speaker_id)
+
+        key, hit = self._cached_wav(query, speaker_id)
+        if hit is not None:
+            return hit.read_bytes() if dst is None else link_or_copy(hit, dst)
+
+        query = {**query, **self.params}
+
+        wav = self.pool.request(
+            "POST", "/synthesis",
+            params={"speaker": speaker_id},
+            data=json.dumps(query),
+            timeout=30,
+        ).content
+
+        return self._store(key, wav, dst)
+
+    def multi_synthesize(self, queries: Sequence[dict], speaker_id: int) -> List[bytes]:
+        """同じ style ID の audio_query 群を POST /multi_synthesis 1 回で合成 (zip を入力順に展開)"""
+        resp = self.pool.request(
+            "POST", "/multi_synthesis",
+            params={"speaker": speaker_id},
+            data=json.dumps([{**q, **self.params} for q in queries]),
+            timeout=30 * len(queries),
+        )
+        with zipfile.ZipFile(io.BytesIO(resp.content)) as zf:
+            # 中身は 001.wav, 002.wav, … (ゼロ埋めの連番なので名前順 = 入力順)
+            names = sorted(n for n in zf.namelist() if n.lower().endswith(".wav"))
+            if len(names) != len(queries):
+                raise RuntimeError(
+                    f"multi_synthesis の戻り値が {len(names)} 件です (要求 {len(queries)} 件)"
+                )
+            return [zf.read(n) for n in names]
+
+    def synthesize_many(self, items: Sequence[Tuple[str, str]]) -> List[bytes]:
+        """(text, speaker) の列をスレッドで並列に合成 (戻り値は入力順)
+
+        同時に飛ぶリクエスト数は EnginePool がホストごとの上限 (自動調整) で絞る。
+        """
+        return self._synthesize_all(items, None)
+
+    def synthesize_to(self, items: Sequence[Tuple[str, str]], dsts: Sequence[str | Path]) -> List[Path]:
+        """synthesize_many と同じだが、i 行目を dsts[i] に書き出してパスを返す"""
+        if len(dsts) != len(items):
+            raise ValueError("items と dsts の要素数が一致しません")
+        return self._synthesize_all(items, [Path(d) for d in dsts])
+
+    def _synthesize_all(
+        self, items: Sequence[Tuple[str, str]], dsts: Optional[List[Path]]
+    ) -> List[Union[bytes, Path]]:
+        t0 = time.perf_counter()
+        dst = (lambda i: dsts[i]) if dsts is not None else (lambda i: None)
+        if self.batch_size > 1 and len(items) > 1:
+            wavs = self._synthesize_batched(items, dsts)
+        elif self.max_inflight == 1 or len(items) <= 1:
+            wavs = [self._synthesize(text, speaker, dst(i)) for i, (text, speaker) in enumerate(items)]
+        else:
+            workers = min(self.max_inflight, len(items))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="voicevox") as pool:
+                wavs = list(pool.map(lambda i: self._synthesize(*items[i], dst(i)), range(len(items))))
+        elapsed = time.perf_counter() - t0
+        self.evict_caches()
+        print(f"🗣 TTS {len(items)} 行 {elapsed:.2f}s ({len(items) / max(elapsed, 1e-9):.1f} 行/s)")
+        print(f"🔀 engines {self.pool.stats()}")
+        return wavs
+
+    @property
+    def max_inflight(self) -> int:
+        """スレッド数 (全ホストの同時リクエスト数の上限の合計)"""
+        return self.pool.max_inflight
+
+    def _synthesize_batched(
+        self, items: Sequence[Tuple[str, str]], dsts: Optional[List[Path]] = None
+    ) -> List[Union[bytes, Path]]:
+        """audio_query は行ごと、キャッシュに無い行だけ style ID ごとに batch_size 件ずつ合成"""
+        speaker_ids = [self.speaker_map.get(speaker, 1) for _, speaker in items]
+
+        def prepare(i: int) -> Tuple[dict, Optional[str], Optional[Union[bytes, Path]]]:
+            query = self.audio_query(items[i][0], speaker_ids[i])
+            key, hit = self._cached_wav(query, speaker_ids[i])
+            if hit is not None:
+                hit = hit.read_bytes() if dsts is None else link_or_copy(hit, dsts[i])
+            return query, key, hit
+
+        workers = min(self.max_inflight, len(items))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="voicevox") as pool:
+            prepared = list(pool.map(prepare, range(len(items))))
+            wavs: List[Optional[Union[bytes, Path]]] = [wav for _, _, wav in prepared]
+
+            by_style: Dict[int, List[int]] = {}
+            for i, wav in enumerate(wavs):
+                if wav is None:
+                    by_style.setdefault(speaker_ids[i], []).append(i)
+            batches = [
+                (speaker_id, idx[j:j + self.batch_size])
+                for speaker_id, idx in by_style.items()
+                for j in range(0, len(idx), self.batch_size)
+            ]
+
+            def run(batch: Tuple[int, List[int]]) -> None:
+                speaker_id, idx = batch
+                out = self.multi_synthesize([prepared[i][0] for i in idx], speaker_id)
+                for i, wav in zip(idx, out):
+                    wavs[i] = self._store(prepared[i][1], wav, dsts[i] if dsts is not None else None)
+
+            list(pool.map(run, batches))
+        return wavs
+
+    def evict_caches(self) -> None:
+        """キャッシュを上限まで削って hit / miss を表示 (今回使ったものは mtime が新しいので残る)"""
+        for cache in (self.query_cache, self.wav_cache):
+            if cache is not None:
+                cache.evict()
+                print(f"🗃 cache {cache.stats()}")
+
+
+# ────────────────────────────
+# ベンチマーク
+# ────────────────────────────
+def compare_batch_sizes(
+    items: Sequence[Tuple[str, str]],
+    sizes: Sequence[int] = (1, 4, 8, 16),
+    **kwargs,
+) -> Dict[int, float]:
+    """同じ (text, speaker) 列を batch_size ごとに合成して所要時間を比較表示 (キャッシュ無効)
+
+    kwargs は VoiceVoxTTS にそのまま渡す (host / char_style / concurrency など)。
+    """
+    results: Dict[int, float] = {}
+    for size in sizes:
+        tts = VoiceVoxTTS(use_cache=False, batch_size=size, **kwargs)
+        t0 = time.perf_counter()
+        tts.synthesize_many(items)
+        results[size] = time.perf_counter() - t0
+
+    base = results[sizes[0]]
+    print(f"{'batch':>6} {'time':>9} {'lines/s':>8}  (vs batch={sizes[0]})")
+    for size, t in results.items():
+        print(f"{size:>6} {t:8.2f}s {len(items) / t:8.1f}  ({t / base * 100:5.1f}% time)")
+    return results
+
+
+if __name__ == "__main__":
+    from llm_video_generation.src.tts import extract_dialogues_with_speaker
+
+    # 読み生成 (LLM) は通さず、台本の文をそのまま合成して比較する
+    scenario = json.loads(Path("llm_video_generation/src/main/s.json").read_text(encoding="utf-8"))
+    compare_batch_sizes(
+        extract_dialogues_with_speaker(scenario),
+        char_style={"1": "四国めたん/ノーマル", "2": "ずんだもん/ノーマル"},
+    )
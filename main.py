@@ -2,23 +2,28 @@
 # ──────────────────────────────────────────────────────────
 # 1) 台本生成（scenario.ScenarioBuilder）
 # 2) 画像収集（Pixabay）
-# 3) イントロ動画作成 → メイン動画作成
-# 4) FFmpeg concat demuxer (-c copy) で連結して final.mp4
+# 3) 音声合成 (イントロ + 本編をまとめて 1 回: tts.TTSService)
+# 4) イントロ動画作成 → メイン動画作成
+# 5) FFmpeg concat demuxer (-c copy) で連結して final.mp4
+#    (イントロ / 本編は encoding.py の共通プロファイルで書き出すので再エンコード不要)
 # SCENARIO_DEBUG_DUMP=1 を指定すると LLM の入出力が .ai_dumps/ に保存
+# --draft で 640×360 / 15 fps / ultrafast のプレビュー (台本チェック用)
+# --profile fhd で 1920×1080 (レイアウトは画面比率なので同じ見た目)
+# VOICEVOX_HOSTS=http://a:50021,http://b:50021 で複数の VoiceVox エンジンに分散
 # ──────────────────────────────────────────────────────────
 
 from __future__ import annotations
 
 from pathlib import Path
+import argparse
 import os
 import json
 import tempfile
-import ffmpeg
 
 # プロジェクト内モジュール
-from llm_video_generation.src import scenario, format
-from llm_video_generation.src.intro import intro_tts, intro_video
-from llm_video_generation.src.main import image, main_tts, main_video
+from llm_video_generation.src import audio_mix, scenario, format, encoding, tts, voicevox
+from llm_video_generation.src.intro import intro_video
+from llm_video_generation.src.main import image, main_video
 
 # ===== 設定 =====
 THEME = "あなたはなぜ“つい後回し”してしまうのか？"
@@ -27,6 +32,20 @@ VIDEO_LENGTH_MINUTES = 4
 INTRO_CHAR_STYLE = {"1": "もち子さん/ノーマル"}
 MAIN_CHAR_STYLE  = {"1": "四国めたん/ノーマル", "2": "ずんだもん/ノーマル"}
 TTS_PARAMS       = {"speedScale": 1.1, "intonationScale": 1.1}
+# エンジン 1 ホストあたりの同時リクエスト数の初期値
+# (応答時間を見て 1〜voicevox.MAX_CONCURRENCY の間で自動調整。最終値はログに出る)
+TTS_CONCURRENCY  = 4
+# VoiceVox エンジン (カンマ区切りで複数ホスト → 処理中の少ないホストへ振り分け)
+TTS_HOSTS        = os.getenv("VOICEVOX_HOSTS", voicevox.DEFAULT_HOST).split(",")
+# >1 で同じ話者の行を /multi_synthesis にまとめる
+# (エンジンのホストごとに `python -m llm_video_generation.src.voicevox` で測って決める)
+TTS_BATCH_SIZE   = 1
+# 読み辞書 (assets/reading_dict.json) を VoiceVox のユーザー辞書にも登録するか
+TTS_SYNC_USER_DICT = False
+
+# 本編のレンダリング方式
+# ("timeline": 1 グラフ 1 エンコード / "segments": 旧方式 / "parallel": 旧方式を並列化)
+BODY_RENDER_MODE = "timeline"
 
 INTRO_BGM_PATH = "llm_video_generation/assets/bgm/Mineral.mp3"
 INTRO_SE_PATH  = "llm_video_generation/assets/se/5.mp3"
@@ -38,52 +57,42 @@ TMP_DIR.mkdir(exist_ok=True)
 
 
 # ===== FFmpegユーティリティ =====
-def _reencode(src: Path, dst: Path) -> None:
-    """src を libx264/aac/yuv420p/30fps に再エンコード"""
-    (
-        ffmpeg
-        .input(str(src))
-        .output(
-            str(dst),
-            vcodec="libx264",
-            acodec="aac",
-            pix_fmt="yuv420p",
-            r=30,
-            movflags="+faststart",
-            loglevel="error",
-        )
-        .overwrite_output()
-        .run()
-    )
-
-
-def concat_videos(intro_path: Path, body_path: Path, output_path: Path) -> Path:
-    """イントロ→ボディの順で厳密連結 (-c copy)"""
-    intro_path = Path(intro_path)
-    body_path  = Path(body_path)
-
-    intro_tmp = TMP_DIR / "intro_prepared.mp4"
-    body_tmp  = TMP_DIR / "body_prepared.mp4"
-
-    _reencode(intro_path, intro_tmp)
-    _reencode(body_path, body_tmp)
+def _reencode(src: Path, dst: Path, profile: encoding.RenderProfile) -> None:
+    """src を共通エンコードプロファイル (encoding.py) で再エンコード"""
+    encoding.reencode(src, dst, profile)
+
+
+def concat_videos(
+    intro_path: Path,
+    body_path: Path,
+    output_path: Path,
+    profile: encoding.RenderProfile = encoding.DEFAULT_PROFILE,
+) -> Path:
+    """イントロ→ボディの順で厳密連結 (-c copy)
+
+    両者は encoding.py の共通プロファイルで書き出されているので、そのまま
+    ストリームコピーで連結する。probe で食い違いが見つかったファイルだけ
+    フォールバックとして再エンコードする。
+    """
+    sources = [Path(intro_path), Path(body_path)]
+    prepared: list[Path] = []
+    temps: list[Path] = []
+    for src in sources:
+        diff = encoding.mismatches(src, profile)
+        if not diff:
+            prepared.append(src)
+            continue
+        print(f"⚠️ {src.name} がエンコードプロファイルと不一致のため再エンコードします: {diff}")
+        tmp = TMP_DIR / f"{src.stem}_prepared.mp4"
+        _reencode(src, tmp, profile)
+        prepared.append(tmp)
+        temps.append(tmp)
 
     list_file = TMP_DIR / "list.txt"
-    list_file.write_text(
-        f"file '{intro_tmp.as_posix()}'\nfile '{body_tmp.as_posix()}'\n",
-        encoding="utf-8",
-    )
-
-    (
-        ffmpeg
-        .input(str(list_file), format="concat", safe=0)
-        .output(str(output_path), c="copy", movflags="+faststart", loglevel="error")
-        .overwrite_output()
-        .run()
-    )
+    encoding.concat_copy(prepared, list_file, output_path)
 
     # 後始末
-    for f in (intro_tmp, body_tmp, list_file):
+    for f in (*temps, list_file):
         try:
             f.unlink()
         except FileNotFoundError:
@@ -134,37 +143,78 @@ def collect_images(script: dict) -> list[str | None]:
     return urls
 
 
-# ===== イントロ動画生成 =====
-def create_intro_video(script: dict) -> Path:
-    tts_pipeline = intro_tts.IntroductionTTSPipeline(
-        char_style=INTRO_CHAR_STYLE, tts_params=TTS_PARAMS, processes=3
+# ===== 音声合成 (イントロ + 本編) =====
+def synthesize_voices(script: dict, out_dir: str | Path) -> tts.TTSResult:
+    service = tts.TTSService(
+        intro_char_style=INTRO_CHAR_STYLE,
+        body_char_style=MAIN_CHAR_STYLE,
+        tts_params=TTS_PARAMS,
+        concurrency=TTS_CONCURRENCY,
+        batch_size=TTS_BATCH_SIZE,
+        hosts=TTS_HOSTS,
+        sync_user_dict=TTS_SYNC_USER_DICT,
     )
-    audio_bytes = tts_pipeline.run(script, speaker="1")
+    # WAV は out_dir へ書き出す (メモリには持たず、動画側はパスから読む)
+    voices = service.run(script, out_dir=out_dir)
+    print(f"✅ 音声合成完了 (イントロ {len(voices.intro)} 行 / 本編 {len(voices.body)} 行)")
+    return voices
+
+
+# ===== イントロ動画生成 =====
+def create_intro_video(
+    script: dict,
+    wavs: list[audio_mix.WavSource],
+    profile: encoding.RenderProfile = encoding.DEFAULT_PROFILE,
+) -> Path:
     path        = intro_video.build_intro_video(
-        script, audio_bytes, output_path="intro.mp4"
+        script, wavs, output_path=_output_name("intro", profile), profile=profile
     )
     print(f"✅ イントロ動画生成完了: {path}")
     return Path(path)
 
 
 # ===== メイン動画生成 =====
-def create_main_video(script: dict, image_urls: list[str | None]) -> Path:
-    tts_pipeline = main_tts.TTSPipeline(
-        char_style=MAIN_CHAR_STYLE, tts_params=TTS_PARAMS, processes=3
-    )
-    audio_bytes = tts_pipeline.run(script)
-    assembler   = main_video.VideoAssembler()
+def create_main_video(
+    script: dict,
+    image_urls: list[str | None],
+    wavs: list[audio_mix.WavSource],
+    profile: encoding.RenderProfile = encoding.DEFAULT_PROFILE,
+) -> Path:
+    assembler   = main_video.VideoAssembler(profile=profile)
     path        = assembler.build_full_video(
-        script, audio_bytes, image_urls, "body.mp4"
+        script, wavs, image_urls, _output_name("body", profile), mode=BODY_RENDER_MODE
     )
     print(f"✅ メイン動画生成完了: {path}")
     return Path(path)
 
 
 # ===== エントリポイント =====
+def _output_name(stem: str, profile: encoding.RenderProfile) -> str:
+    """既定プロファイル以外は本番の出力を上書きしないよう名前にプロファイル名を付ける"""
+    if profile == encoding.DEFAULT_PROFILE:
+        return f"{stem}.mp4"
+    return f"{stem}_{profile.name}.mp4"
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="台本から解説動画を生成")
+    parser.add_argument(
+        "--profile", choices=sorted(encoding.PROFILES), default=encoding.DEFAULT_PROFILE.name,
+        help="出力解像度 / fps / x264 preset の組",
+    )
+    parser.add_argument(
+        "--draft", action="store_true",
+        help="--profile draft の省略形 (640x360 の確認用プレビュー)",
+    )
+    return parser.parse_args()
+
+
 def main() -> None:
     from pathlib import Path
 
+    args    = _parse_args()
+    profile = encoding.DRAFT if args.draft else encoding.PROFILES[args.profile]
+
     CACHE_PATH = Path("llm_video_generation/src/main/s.json")
 
     # 参考資料を使うならここで読み込んで渡せる 無しなら reference = None
@@ -176,9 +226,14 @@ def main() -> None:
     
     script = json.loads(CACHE_PATH.read_text(encoding="utf-8"))
     image_urls  = collect_images(script)
-    intro_path  = create_intro_video(script)
-    body_path   = create_main_video(script, image_urls)
-    final_path  = concat_videos(intro_path, body_path, Path("final.mp4"))
+    # 音声 WAV は実行ごとの一時ディレクトリに置き、動画を連結し終えたら消す
+    with tempfile.TemporaryDirectory(prefix="audio_", dir=TMP_DIR) as audio_dir:
+        voices      = synthesize_voices(script, audio_dir)
+        intro_path  = create_intro_video(script, voices.intro, profile)
+        body_path   = create_main_video(script, image_urls, voices.body, profile)
+        final_path  = concat_videos(
+            intro_path, body_path, Path(_output_name("final", profile)), profile
+        )
     print(f"🎉 完成動画: {final_path.resolve()}")
 
 